@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Multipart upload throughput across chunk sizes on local storage.
+
+Writes a file of ``--size`` MiB into a local ``PyFSFileStorage`` part by
+part, the way ``upload_files`` does, once per chunk size, and reports the
+throughput and the number of parts (i.e. ``Part`` rows and commits) each
+chunk size results in. Database time is not included.
+
+    python benchmarks/chunk_size.py --size 2048 --parallel 4
+"""
+
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from invenio_files_rest.storage import PyFSFileStorage
+
+from ultraviolet_cli.uploads import FileWindow, MiB
+
+CHUNK_SIZES = (5, 16, 64, 256, 1024)
+"""Chunk sizes in MiB."""
+
+
+def write_parts(storage, path, size, chunk_size, numbers):
+    """Write the parts ``numbers`` of ``path`` into ``storage``."""
+    with open(path, 'rb') as f:
+        for number in numbers:
+            start = number * chunk_size
+            part_size = min(chunk_size, size - start)
+            storage.update(
+                FileWindow(f.fileno(), start, part_size),
+                seek=start, size=part_size,
+            )
+
+
+@click.command()
+@click.option('-s', '--size', type=click.IntRange(min=1), default=1024,
+              show_default=True, help='File size in MiB.')
+@click.option('-p', '--parallel', type=click.IntRange(min=1), default=1,
+              show_default=True, help='Number of threads writing parts.')
+@click.option('-c', '--chunk-size', 'chunk_sizes', type=int, multiple=True,
+              help='Chunk size in MiB, may be repeated.')
+def main(size, parallel, chunk_sizes):
+    """Report multipart write throughput per chunk size."""
+    size = size * MiB
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'source.bin')
+        with open(source, 'wb') as f:
+            for _ in range(size // MiB):
+                f.write(os.urandom(MiB))
+
+        click.echo(f'{"chunk MiB":>10} {"parts":>8} {"seconds":>8} '
+                   f'{"MiB/s":>8}')
+        for chunk_mib in chunk_sizes or CHUNK_SIZES:
+            chunk_size = chunk_mib * MiB
+            parts = -(-size // chunk_size)
+            target = os.path.join(tmp, f'target-{chunk_mib}.bin')
+            storage = PyFSFileStorage(target)
+            storage.initialize(size=size)
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=parallel) as executor:
+                futures = [
+                    executor.submit(
+                        write_parts, storage, source, size, chunk_size,
+                        range(number, parts, parallel),
+                    )
+                    for number in range(parallel)
+                ]
+                for future in futures:
+                    future.result()
+            elapsed = time.perf_counter() - start
+
+            click.echo(f'{chunk_mib:>10} {parts:>8} {elapsed:>8.2f} '
+                       f'{size / MiB / elapsed:>8.1f}')
+            storage.delete()
+
+
+if __name__ == '__main__':
+    main()
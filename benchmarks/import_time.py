@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Cold start time of the ``ultraviolet-cli`` command line.
+
+Runs each command line ``--runs`` times in a fresh interpreter and reports
+the fastest wall time, along with the slowest top level imports of the
+last run as reported by ``python -X importtime``. With ``--max-seconds``,
+exits non-zero if any command line is slower, to catch imports creeping
+back into the start of the CLI.
+
+    python benchmarks/import_time.py --max-seconds 1.0
+"""
+
+import subprocess
+import sys
+import time
+
+import click
+
+COMMAND_LINES = (
+    ('--help',),
+    ('fixtures', '--help'),
+    ('fixtures', 'validate', '--help'),
+)
+"""Command lines timed by default."""
+
+RUNNER = 'from ultraviolet_cli.cli import cli; cli(prog_name="uv-cli")'
+
+
+def time_command(args):
+    """Return the wall time and ``-X importtime`` report of ``args``.
+
+    Fails if the command line exits with an error, which would otherwise
+    be timed as a fast start.
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', RUNNER, *args],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines()
+                  if not line.startswith('import time:')]
+        raise click.ClickException(
+            f'uv-cli {" ".join(args)} exited with status '
+            f'{result.returncode}:\n' + '\n'.join(errors[-20:])
+        )
+    return seconds, result.stderr
+
+
+def top_imports(report, count):
+    """Return the ``count`` slowest top level imports of a report."""
+    imports = []
+    for line in report.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented below the module importing them.
+        if cumulative.strip().isdigit() and not name.startswith('  '):
+            imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+@click.command()
+@click.option('-r', '--runs', type=click.IntRange(min=1), default=5,
+              show_default=True, help='Runs per command line.')
+@click.option('-t', '--top', type=click.IntRange(min=0), default=5,
+              show_default=True, help='Slowest imports listed per command.')
+@click.option('-m', '--max-seconds', type=float,
+              help='Fail if a command line takes longer than this.')
+@click.argument('args', nargs=-1)
+def main(runs, top, max_seconds, args):
+    """Report the start time of ``ultraviolet-cli`` command lines.
+
+    ARGS is a single command line to time instead of the defaults.
+    """
+    command_lines = (args,) if args else COMMAND_LINES
+    slow = False
+    for command_line in command_lines:
+        timings = [time_command(command_line) for _ in range(runs)]
+        best = min(seconds for seconds, _ in timings)
+        slow = slow or (max_seconds is not None and best > max_seconds)
+        click.echo(f'{best:8.3f}s  uv-cli {" ".join(command_line)}')
+        for micros, name in top_imports(timings[-1][1], top):
+            click.echo(f'{micros / 1e6:18.3f}s  {name}')
+
+    if slow:
+        raise SystemExit(f'Slower than {max_seconds}s.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+
+# Usage:
+#   env DB=postgresql12 SEARCH=opensearch2 ./run-benchmarks.sh [PYTEST ARGS]
+#
+# Saves every run under .benchmarks/. Once a run has been saved, later runs
+# are compared to the latest one and fail if a benchmark got slower by more
+# than BENCHMARK_FAIL (default median:50%). The median and the wide margin
+# keep the noise of shared machines from failing the comparison.
+
+# Quit on errors
+set -o errexit
+
+# Quit on unbound symbols
+set -o nounset
+
+# Always bring down docker services
+function cleanup() {
+    eval "$(docker-services-cli down --env)"
+}
+trap cleanup EXIT
+
+compare=()
+if compgen -G ".benchmarks/*/*.json" > /dev/null; then
+    compare=(--benchmark-compare "--benchmark-compare-fail=${BENCHMARK_FAIL:-median:50%}")
+else
+    echo "No saved benchmark run under .benchmarks/, nothing to compare to." >&2
+fi
+
+eval "$(docker-services-cli up --db ${DB:-postgresql} --search ${SEARCH:-elasticsearch} --cache ${CACHE:-redis} --mq ${MQ:-rabbitmq} --env)"
+python -m pytest tests/benchmarks -o addopts="" --benchmark-only \
+    --benchmark-autosave --benchmark-columns=min,median,mean,stddev,rounds \
+    "${compare[@]}" "$@"
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Fixtures for the benchmarks.
+
+The benchmarks are skipped by ``--benchmark-skip`` in ``pytest.ini``. Run
+them on their own with::
+
+    python -m pytest tests/benchmarks -o addopts="" --benchmark-only
+"""
+
+import json
+
+import pytest
+
+from ultraviolet_cli.stub_server import StubRecordsAPI, running
+
+SCHEMA = {
+    'type': 'object',
+    'required': ['access', 'metadata'],
+    'properties': {
+        'access': {
+            'type': 'object',
+            'required': ['record', 'files'],
+            'properties': {
+                'record': {'enum': ['public', 'restricted']},
+                'files': {'enum': ['public', 'restricted']},
+            },
+        },
+        'metadata': {
+            'type': 'object',
+            'required': ['title', 'creators', 'publication_date',
+                         'resource_type'],
+            'properties': {
+                'title': {'type': 'string', 'minLength': 1},
+                'publication_date': {
+                    'type': 'string',
+                    'pattern': r'^\d{4}(-\d{2}){0,2}$',
+                },
+                'resource_type': {
+                    'type': 'object',
+                    'required': ['id'],
+                    'properties': {'id': {'type': 'string'}},
+                },
+                'creators': {
+                    'type': 'array',
+                    'minItems': 1,
+                    'items': {
+                        'type': 'object',
+                        'required': ['person_or_org'],
+                        'properties': {
+                            'person_or_org': {
+                                'type': 'object',
+                                'required': ['type', 'family_name'],
+                                'properties': {
+                                    'type': {'enum': ['personal',
+                                                      'organizational']},
+                                    'given_name': {'type': 'string'},
+                                    'family_name': {'type': 'string'},
+                                },
+                            },
+                            'affiliations': {
+                                'type': 'array',
+                                'items': {
+                                    'type': 'object',
+                                    'properties': {
+                                        'name': {'type': 'string'},
+                                    },
+                                },
+                            },
+                        },
+                    },
+                },
+                'subjects': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {'subject': {'type': 'string'}},
+                    },
+                },
+            },
+        },
+    },
+}
+"""Schema shaped like the RDM record schema, small enough to ship."""
+
+
+def make_record(number):
+    """Return a synthetic record, every tenth of which is invalid."""
+    record = {
+        'access': {'record': 'public', 'files': 'public'},
+        'metadata': {
+            'title': f'Synthetic record {number}',
+            'publication_date': f'{2000 + number % 20}-01-01',
+            'resource_type': {'id': 'dataset'},
+            'creators': [
+                {
+                    'person_or_org': {
+                        'type': 'personal',
+                        'given_name': 'Ada',
+                        'family_name': f'Lovelace {i}',
+                    },
+                    'affiliations': [{'name': 'New York University'}],
+                }
+                for i in range(1 + number % 5)
+            ],
+            'subjects': [{'subject': f'subject {i}'} for i in range(10)],
+        },
+    }
+    if number % 10 == 0:
+        del record['metadata']['title']
+    return record
+
+
+def write_corpus(directory, size):
+    """Write ``size`` records into ``<directory>/<uv id>/record.json``."""
+    files = []
+    for number in range(size):
+        record_dir = directory / f'{number:06d}'
+        record_dir.mkdir(parents=True)
+        path = record_dir / 'record.json'
+        path.write_text(json.dumps(make_record(number)))
+        files.append(str(path))
+    return files
+
+
+@pytest.fixture(scope='session')
+def corpus(tmp_path_factory):
+    """Return a function building (once) a corpus of a given size.
+
+    :returns: ``(directory, files, schema_file)``.
+    """
+    corpora = {}
+    root = tmp_path_factory.mktemp('corpora')
+    schema_file = root / 'schema.json'
+    schema_file.write_text(json.dumps(SCHEMA))
+
+    def build(size):
+        if size not in corpora:
+            directory = root / str(size)
+            corpora[size] = (directory, write_corpus(directory, size))
+        directory, files = corpora[size]
+        return str(directory), files, str(schema_file)
+
+    return build
+
+
+@pytest.fixture(scope='module')
+def stub_api():
+    """Serve a stub records API and return its URL."""
+    with running() as api:
+        yield api.base_url
+
+
+@pytest.fixture
+def throttled_api():
+    """Serve a stub records API throttling requests above 200 a second."""
+    with running(StubRecordsAPI(rate_limit=200, retry_after=1)) as api:
+        yield api
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Benchmarks of the start time of the command line."""
+
+import subprocess
+import sys
+
+import pytest
+
+RUNNER = 'from ultraviolet_cli.cli import cli; cli(prog_name="uv-cli")'
+
+
+@pytest.mark.parametrize('args', [
+    ['--help'],
+    ['fixtures', '--help'],
+    ['upload-files', '--help'],
+], ids=' '.join)
+def test_cold_start(benchmark, args):
+    """Start a fresh interpreter running ``uv-cli <args>``."""
+    benchmark.pedantic(
+        subprocess.run, rounds=5,
+        args=([sys.executable, '-c', RUNNER, *args],),
+        kwargs={'check': True, 'stdout': subprocess.DEVNULL},
+    )
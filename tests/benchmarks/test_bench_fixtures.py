@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Benchmarks of the REST API fixtures commands against a stub server."""
+
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from ultraviolet_cli.commands.fixtures import ingest, purge
+
+SIZE = 1000
+
+
+def run(command, *args):
+    """Run ``command`` and check that it succeeded."""
+    result = CliRunner().invoke(command, args)
+    assert result.exit_code == 0, result.output
+
+
+@pytest.mark.parametrize('workers', [1, 4, 16])
+def test_ingest(benchmark, corpus, stub_api, tmp_path, workers):
+    """Post a corpus of drafts with ``workers`` threads."""
+    directory, _, _ = corpus(SIZE)
+    output = str(tmp_path / 'map.json')
+
+    def setup():
+        if os.path.exists(output):
+            os.remove(output)
+
+    benchmark.pedantic(
+        run, setup=setup, rounds=3,
+        args=(ingest, '-a', stub_api, '-d', directory, '-o', output,
+              '-t', 'token', '-w', str(workers)),
+    )
+
+
+@pytest.mark.parametrize('workers', [1, 4, 16])
+def test_purge(benchmark, corpus, stub_api, tmp_path, workers):
+    """Delete a corpus of drafts with ``workers`` threads."""
+    directory, _, _ = corpus(SIZE)
+    output = str(tmp_path / 'map.json')
+
+    def setup():
+        run(ingest, '-a', stub_api, '-d', directory, '-o', output,
+            '-t', 'token', '-w', '16')
+
+    benchmark.pedantic(
+        run, setup=setup, rounds=3,
+        args=(purge, '-a', stub_api, '-d', directory, '-o', output,
+              '-t', 'token', '-w', str(workers)),
+    )
+
+
+def test_ingest_throttled(benchmark, corpus, throttled_api, tmp_path):
+    """Post a corpus of drafts to an API answering 429 above its limit."""
+    directory, _, _ = corpus(SIZE)
+    output = str(tmp_path / 'map.json')
+
+    def setup():
+        if os.path.exists(output):
+            os.remove(output)
+
+    benchmark.pedantic(
+        run, setup=setup, rounds=1,
+        args=(ingest, '-a', throttled_api.base_url, '-d', directory,
+              '-o', output, '-t', 'token', '-w', '16'),
+    )
+    assert throttled_api.stats['POST', 429]
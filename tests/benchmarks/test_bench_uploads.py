@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Benchmarks of multipart uploads into a local filesystem bucket."""
+
+import itertools
+import os
+
+import pytest
+from invenio_files_rest.models import Bucket, Location
+
+from ultraviolet_cli.uploads import MiB, upload_multipart
+
+SIZE = 256 * MiB
+
+
+@pytest.fixture()
+def bucket(db, tmp_path):
+    """Return a bucket stored in a temporary directory."""
+    location = Location(name='benchmark', uri=str(tmp_path / 'storage'),
+                        default=True)
+    db.session.add(location)
+    db.session.commit()
+    bucket = Bucket.create(location)
+    db.session.commit()
+    return bucket
+
+
+@pytest.fixture(scope='module')
+def source(tmp_path_factory):
+    """Return the path of a file of random data to upload."""
+    path = tmp_path_factory.mktemp('source') / 'source.bin'
+    with open(path, 'wb') as f:
+        for _ in range(SIZE // MiB):
+            f.write(os.urandom(MiB))
+    return str(path)
+
+
+@pytest.mark.parametrize('parallel', [1, 4])
+@pytest.mark.parametrize('chunk_size', [5 * MiB, 64 * MiB])
+def test_upload_multipart(benchmark, bucket, source, chunk_size, parallel):
+    """Upload a file in parts of ``chunk_size`` with ``parallel`` threads."""
+    keys = (f'source-{number}.bin' for number in itertools.count())
+
+    obj = benchmark.pedantic(
+        lambda: upload_multipart(bucket, next(keys), source,
+                                 chunk_size=chunk_size, parallel=parallel),
+        rounds=3,
+    )
+    assert obj.file.size == SIZE
+    benchmark.extra_info['MiB/s'] = \
+        SIZE / MiB / benchmark.stats.stats.mean
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Benchmarks of fixture validation."""
+
+import pytest
+
+from ultraviolet_cli import validation
+
+
+@pytest.mark.parametrize('jobs', [1, 4])
+@pytest.mark.parametrize('size', [1000, 10000, 100000])
+def test_validate_files(benchmark, corpus, size, jobs):
+    """Validate a corpus of ``size`` records with ``jobs`` processes."""
+    _, files, schema_file = corpus(size)
+    schema = validation.load_schema(schema_file)
+
+    results = benchmark.pedantic(
+        lambda: list(validation.validate_files(files, schema, jobs=jobs)),
+        rounds=1 if size >= 100000 else 3,
+    )
+    assert len(results) == size
+    assert sum(1 for _, errors in results if errors) == size // 10
+
+
+def test_validate_cached(benchmark, corpus, tmp_path):
+    """Validate an unchanged corpus with a warm validation cache."""
+    _, files, schema_file = corpus(10000)
+    schema = validation.load_schema(schema_file)
+    cache = validation.ValidationCache(str(tmp_path / 'cache.json'), schema)
+    list(validation.validate_files(files, schema, cache=cache))
+
+    results = benchmark(
+        lambda: list(validation.validate_files(files, schema, cache=cache))
+    )
+    assert len(results) == 10000
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Tests for running command lines in one app."""
+
+import io
+
+import click
+from click.testing import CliRunner
+from flask import Flask, current_app
+from flask.cli import with_appcontext
+
+from ultraviolet_cli.commands.batch import read_command_lines
+from ultraviolet_cli.utils import create_cli
+
+
+def test_read_command_lines():
+    """Test that comments are skipped and program names dropped."""
+    script = io.StringIO(
+        '# Clean up\n'
+        'uv-cli delete-record abcd-1234\n'
+        '\n'
+        'create-communities -d "NYU Students" students\n'
+    )
+    assert list(read_command_lines(script)) == [
+        (2, ['delete-record', 'abcd-1234']),
+        (4, ['create-communities', '-d', 'NYU Students', 'students']),
+    ]
+
+
+def test_batch_loads_app_once(tmp_path):
+    """Test that all command lines run in the same app."""
+    apps = []
+
+    def create_app(debug=False):
+        apps.append(Flask('testapp'))
+        return apps[-1]
+
+    @click.command()
+    @click.argument('name')
+    @with_appcontext
+    def hello(name):
+        click.echo(f'hello {name} from {current_app.import_name}')
+
+    @click.command()
+    def fail():
+        raise SystemExit(-1)
+
+    cli = create_cli(create_app=create_app, lazy_commands={
+        'batch': ('ultraviolet_cli.commands.batch:batch', ''),
+    })
+    cli.add_command(hello)
+    cli.add_command(fail)
+
+    script = tmp_path / 'script.txt'
+    script.write_text('hello one\nfail\nhello two\n')
+    result = CliRunner().invoke(cli, ['batch', str(script)])
+    assert 'hello one from testapp' in result.output
+    assert 'hello two from testapp' in result.output
+    assert 'Failed lines: 2' in result.output
+    assert result.exit_code == 1
+    assert len(apps) == 1
+
+    result = CliRunner().invoke(cli, ['batch', '-x', str(script)])
+    assert 'hello two' not in result.output
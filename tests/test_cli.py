@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Tests for the lazily loading command line."""
+
+import importlib
+import json
+import subprocess
+import sys
+
+import click
+from click.testing import CliRunner
+
+from ultraviolet_cli.utils import create_cli
+
+IMPORT_GUARD = '''
+import json, sys
+from click.testing import CliRunner
+from ultraviolet_cli.cli import cli
+result = CliRunner().invoke(cli, ['--help'])
+print(json.dumps([result.exit_code, result.output, sorted(sys.modules)]))
+'''
+
+
+def test_help_imports_no_commands():
+    """Test that listing the commands imports neither them nor the app."""
+    output = subprocess.run(
+        [sys.executable, '-c', IMPORT_GUARD],
+        check=True, stdout=subprocess.PIPE, text=True,
+    ).stdout
+    exit_code, usage, modules = json.loads(output)
+
+    assert exit_code == 0
+    assert 'upload-files        Upload file for a draft.' in usage
+    heavy = [
+        name for name in modules
+        if name.startswith(('ultraviolet_cli.commands', 'invenio_app',
+                            'invenio_communities', 'invenio_files_rest',
+                            'jsonschema', 'requests'))
+    ]
+    assert heavy == []
+
+
+def test_lazy_command_imported_on_use():
+    """Test that a lazy command runs once it is looked up by name."""
+    cli = create_cli(lazy_commands={
+        'hello': ('test_cli:hello', 'Say hello.'),
+    })
+    assert 'hello' not in cli.commands
+
+    result = CliRunner().invoke(cli, ['hello'])
+    assert result.output == 'hello\n'
+    assert 'hello' in cli.commands
+
+
+def test_lazy_exports_shadow_modules():
+    """Test that a command named like its module stays the command."""
+    importlib.import_module('ultraviolet_cli.commands.fixtures')
+    from ultraviolet_cli import commands
+
+    assert isinstance(commands.fixtures, click.Group)
+    assert isinstance(commands.fixtures, click.Group)
+    assert isinstance(commands.ingest, click.Command)
+
+
+def test_fixtures_validate_needs_no_app(tmp_path):
+    """Test that the REST-only fixtures commands import no app or asyncio."""
+    schema = tmp_path / 'schema.json'
+    schema.write_text(json.dumps({'type': 'object'}))
+    (tmp_path / 'records').mkdir()
+    (tmp_path / 'records' / 'record.json').write_text('{}')
+
+    runner = (
+        'import sys; from ultraviolet_cli.cli import cli\n'
+        'try:\n'
+        '    cli(sys.argv[1:])\n'
+        'finally:\n'
+        '    print(*[m for m in sys.modules if m.startswith(\n'
+        '        ("invenio", "asyncio", "ultraviolet_cli.stub_server"))])\n'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', runner, 'fixtures', 'validate',
+         '-d', str(tmp_path / 'records'), '-s', str(schema), '--no-cache'],
+        stdout=subprocess.PIPE, text=True,
+    )
+    assert result.returncode == 0
+    assert result.stdout.splitlines()[-1] == ''
+
+
+@click.command()
+def hello():
+    """Say hello."""
+    click.echo('hello')
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Tests for the pooled REST API client."""
+
+import time
+
+import pytest
+import requests
+
+from ultraviolet_cli.client import RETRY_STATUSES, create_session
+from ultraviolet_cli.commands.fixtures import create_record_draft
+from ultraviolet_cli.stub_server import StubRecordsAPI, running
+
+
+def test_create_session():
+    """Test pool size, retries and default timeout of a new session."""
+    session = create_session(pool_size=8, timeout=3, retries=2)
+
+    adapter = session.get_adapter('https://127.0.0.1:5000/api/records')
+    assert adapter._pool_maxsize == 8
+    assert adapter.max_retries.total == 2
+    assert set(adapter.max_retries.status_forcelist) == set(RETRY_STATUSES)
+    assert 500 not in adapter.max_retries.status_forcelist
+    assert session.timeout == 3
+    assert session.verify is False
+
+
+@pytest.mark.parametrize('status', [502, 503, 504])
+def test_post_not_retried_on_gateway_errors(status):
+    """A POST which may have created a draft is not sent again."""
+    session = create_session(backoff=0)
+    with running(StubRecordsAPI(error_rate=1, error_status=status)) as api:
+        with pytest.raises(requests.exceptions.HTTPError):
+            create_record_draft({}, api.base_url, 'token', session=session)
+        assert session.get(api.base_url).status_code == status
+    assert api.stats['POST', status] == 1
+    assert api.stats['GET', status] == 1 + session.adapters[
+        'http://'].max_retries.total
+
+
+def test_post_not_retried_on_read_timeout():
+    """A POST which timed out is not sent again."""
+    session = create_session(timeout=(5, 0.3), backoff=0)
+    with running(StubRecordsAPI(latency=0.5)) as api:
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            create_record_draft({}, api.base_url, 'token', session=session)
+        # Let the server finish the request the client gave up on.
+        time.sleep(0.5)
+        assert len(api.drafts) == 1
+
+
+def test_post_retried_when_throttled():
+    """A throttled POST is retried after the Retry-After delay."""
+    session = create_session(backoff=0)
+    with running(StubRecordsAPI(rate_limit=1, retry_after=1)) as api:
+        for _ in range(2):
+            create_record_draft({}, api.base_url, 'token', session=session)
+    assert len(api.drafts) == 2
+    assert api.stats['POST', 429] >= 1
+
+
+def test_rate_limit_counts_retries():
+    """Retries wait for the rate limit like the first attempts."""
+    session = create_session(retries=3, backoff=0, rate=5)
+    with running(StubRecordsAPI(error_rate=1)) as api:
+        start = time.monotonic()
+        session.get(api.base_url)
+        elapsed = time.monotonic() - start
+    assert api.stats['GET', 503] == 4
+    # Four requests at five a second are spread over at least 0.6s.
+    assert elapsed >= 0.55
@@ -10,7 +10,76 @@
 See https://pytest-invenio.readthedocs.io/ for documentation on which test
 fixtures are available.
 """
+import importlib
+import json
+from types import SimpleNamespace
+
+import pytest
+from invenio_access.permissions import system_identity
+from invenio_records_resources.services.errors import PermissionDeniedError
+
 from ultraviolet_cli.commands.create_communities import create_communities
+from ultraviolet_cli.indexing import BatchUnitOfWork
+
+# The commands package exports the command under the module's name.
+module = importlib.import_module('ultraviolet_cli.commands.create_communities')
+
+DEFAULTS = {
+    "type": "organization", "visibility": "public", "policy": "open",
+    "owner": "owner@nyu.edu", "add_group": None,
+}
+
+
+@pytest.fixture()
+def manifest(tmp_path):
+    """Return a manifest of three communities, the second one forbidden."""
+    path = tmp_path / 'communities.json'
+    path.write_text(json.dumps([
+        {"name": name, "desc": f"{name} data"}
+        for name in ("physics", "forbidden", "history")
+    ]))
+    return str(path)
+
+
+@pytest.fixture()
+def service(monkeypatch):
+    """Replace the communities service by one refusing ``forbidden``."""
+    def create(data, identity, uow):
+        if data["metadata"]["title"] == "forbidden":
+            raise PermissionDeniedError()
+        return SimpleNamespace(id=f"id-{data['metadata']['title']}")
+
+    monkeypatch.setattr(module, "current_communities", SimpleNamespace(
+        service=SimpleNamespace(create=create)
+    ))
+    monkeypatch.setattr(module.identities, "get_user_identity",
+                        lambda email: system_identity)
+
+
+def test_manifest_row_errors(db, manifest, service, capsys):
+    """Test that any error fails its own row and keeps the batch."""
+    failed = module.create_communities_from_manifest(manifest, DEFAULTS)
+
+    output = capsys.readouterr().out
+    assert failed == 1
+    assert "Row 1 (physics): created with ID id-physics" in output
+    assert "Row 2 (forbidden): PermissionDeniedError" in output
+    assert "Row 3 (history): created with ID id-history" in output
+
+
+def test_manifest_commit_error(db, manifest, service, capsys, monkeypatch):
+    """Test that rows are only reported created once committed."""
+    def commit(self):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(BatchUnitOfWork, "commit", commit)
+    failed = module.create_communities_from_manifest(manifest, DEFAULTS)
+
+    output = capsys.readouterr().out
+    assert failed == 3
+    assert "created with ID" not in output
+    assert "Row 1 (physics): not saved, the batch failed to commit: " \
+        "database went away" in output
 
 
 def test_cli_create_communities(cli_runner):
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Tests for bulk record deletion."""
+
+import importlib
+import io
+from types import SimpleNamespace
+
+import pytest
+from invenio_pidstore.errors import PIDDeletedError, PIDDoesNotExistError
+from invenio_records_resources.services.errors import PermissionDeniedError
+
+from ultraviolet_cli.commands.delete_record import error_category, read_pids
+from ultraviolet_cli.indexing import BatchUnitOfWork
+
+# The commands package exports the command under the module's name.
+module = importlib.import_module('ultraviolet_cli.commands.delete_record')
+
+
+def test_read_pids():
+    """Test that blank lines and comments are skipped."""
+    file = io.StringIO('abcd-1234\n\n# old records\n  efgh-5678 \n')
+    assert list(read_pids(file)) == ['abcd-1234', 'efgh-5678']
+
+
+@pytest.mark.parametrize('error,category', [
+    (PIDDoesNotExistError('recid', 'abcd-1234'), 'not_found'),
+    (PIDDeletedError(None, None), 'already_deleted'),
+    (PermissionDeniedError(), 'permission_denied'),
+    (RuntimeError(), 'error'),
+])
+def test_error_category(error, category):
+    """Test that deletion errors are reported by category."""
+    assert error_category(error) == category
+
+
+def test_delete_records_commit_error(db, monkeypatch):
+    """Test that a batch which fails to commit is reported and skipped."""
+    def delete(identity, pid, uow):
+        if pid == 'missing':
+            raise PIDDoesNotExistError('recid', pid)
+
+    commit = BatchUnitOfWork.commit
+    commits = []
+
+    def failing_commit(self):
+        commits.append(self)
+        if len(commits) == 1:
+            raise RuntimeError('database went away')
+        return commit(self)
+
+    monkeypatch.setattr(module, 'current_rdm_records', SimpleNamespace(
+        records_service=SimpleNamespace(delete=delete)
+    ))
+    monkeypatch.setattr(BatchUnitOfWork, 'commit', failing_commit)
+    outcomes = list(module.delete_records(
+        ['abcd-1234', 'missing', 'efgh-5678'], batch_size=2
+    ))
+
+    assert [(pid, category) for pid, category, _ in outcomes] == [
+        ('abcd-1234', 'commit_failed'),
+        ('missing', 'not_found'),
+        ('efgh-5678', None),
+    ]
+    assert str(outcomes[0][2]) == 'database went away'
+    assert len(commits) == 2
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Tests of the REST API fixtures commands against the stub records API."""
+
+import importlib
+import json
+
+import click
+import pytest
+from click.testing import CliRunner
+from flask.cli import ScriptInfo
+from werkzeug.utils import ImportStringError
+
+from ultraviolet_cli.pidmap import PIDMap
+from ultraviolet_cli.stub_server import StubRecordsAPI, running
+
+# The commands package exports the fixtures group under the module's name.
+fixtures = importlib.import_module('ultraviolet_cli.commands.fixtures')
+
+
+def write_fixtures(directory, count):
+    """Write ``count`` fixture records and return their paths."""
+    files = []
+    for number in range(count):
+        record_dir = directory / f'uv{number:03d}'
+        record_dir.mkdir(parents=True)
+        path = record_dir / 'record.json'
+        path.write_text(json.dumps({'metadata': {'title': f'R{number}'}}))
+        files.append(path)
+    return files
+
+
+def ingest(api, directory, output, *args):
+    """Run the ingest command and return its result."""
+    return CliRunner().invoke(fixtures.ingest, [
+        '-a', api.base_url, '-d', str(directory), '-o', str(output),
+        '-t', 'token', *args
+    ])
+
+
+def pidmap(output):
+    """Return the PID map at ``output`` as a dict."""
+    with PIDMap(str(output)) as results:
+        return dict(results.items())
+
+
+@pytest.fixture
+def api():
+    """Serve a stub records API for one test."""
+    with running() as api:
+        yield api
+
+
+def test_ingest_skips_unchanged(api, tmp_path):
+    """Files posted by an earlier run are not posted again."""
+    directory, output = tmp_path / 'records', tmp_path / 'map.json'
+    write_fixtures(directory, 5)
+
+    assert ingest(api, directory, output).exit_code == 0
+    result = ingest(api, directory, output)
+
+    assert result.exit_code == 0
+    assert 'Posted 0 of 5 records (5 unchanged)' in result.output
+    assert api.stats['POST', 201] == 5
+    assert set(pidmap(output)) == set(api.drafts)
+
+
+def test_ingest_reposts_edited(api, tmp_path):
+    """An edited file is posted again and its old draft deleted."""
+    directory, output = tmp_path / 'records', tmp_path / 'map.json'
+    files = write_fixtures(directory, 3)
+    ingest(api, directory, output)
+    old_pids = set(api.drafts)
+
+    files[0].write_text(json.dumps({'metadata': {'title': 'Edited'}}))
+    result = ingest(api, directory, output)
+
+    assert result.exit_code == 0
+    assert 'Posted 1 of 3 records (2 unchanged)' in result.output
+    assert len(api.drafts) == 3
+    assert len(old_pids - set(api.drafts)) == 1
+    new_pid, = set(api.drafts) - old_pids
+    assert api.drafts[new_pid]['metadata']['title'] == 'Edited'
+    assert set(pidmap(output)) == set(api.drafts)
+
+
+def test_ingest_deletes_stale_drafts(api, tmp_path):
+    """Drafts replaced by an interrupted run are deleted by the next."""
+    directory, output = tmp_path / 'records', tmp_path / 'map.json'
+    files = write_fixtures(directory, 2)
+    ingest(api, directory, output)
+    entries = pidmap(output)
+
+    # A run which posted the edited file but died before deleting the
+    # draft it replaced.
+    files[0].write_text(json.dumps({'metadata': {'title': 'Edited'}}))
+    stale_pid = next(pid for pid, entry in entries.items()
+                     if entry['file'] == 'uv000/record.json')
+    _, draft = fixtures.post_fixture(str(files[0]), api.base_url, 'token')
+    with PIDMap(str(output)) as results:
+        results.put(draft['id'], dict(entries[stale_pid], hash='edited'))
+
+    result = ingest(api, directory, output)
+
+    assert result.exit_code == 0
+    assert stale_pid not in api.drafts
+    assert stale_pid not in pidmap(output)
+    assert set(pidmap(output)) == set(api.drafts)
+
+
+def test_ingest_resumes_after_interrupt(tmp_path, monkeypatch):
+    """An interrupted run records every draft it created."""
+    directory, output = tmp_path / 'records', tmp_path / 'map.json'
+    write_fixtures(directory, 60)
+    post_fixture = fixtures.post_fixture
+    calls = []
+
+    def interrupted(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 10:
+            raise KeyboardInterrupt
+        return post_fixture(*args, **kwargs)
+
+    with running(StubRecordsAPI(latency=0.02)) as api:
+        monkeypatch.setattr(fixtures, 'post_fixture', interrupted)
+        result = ingest(api, directory, output, '-w', '4')
+        assert result.exit_code != 0
+        # Records queued when the run was interrupted were not posted.
+        assert len(api.drafts) < 30
+        assert set(pidmap(output)) == set(api.drafts)
+
+        monkeypatch.setattr(fixtures, 'post_fixture', post_fixture)
+        result = ingest(api, directory, output, '-w', '4')
+
+    assert result.exit_code == 0
+    assert len(api.drafts) == 60
+    assert set(pidmap(output)) == set(api.drafts)
+
+
+def purge(api, directory, output):
+    """Run the purge command and return its result."""
+    return CliRunner().invoke(fixtures.purge, [
+        '-a', api.base_url, '-d', str(directory), '-o', str(output),
+        '-t', 'token'
+    ])
+
+
+class NoLinksAPI(StubRecordsAPI):
+    """Stub records API sending drafts without links."""
+
+    def create_draft(self, body):
+        """Store a new draft and leave its links out of the response."""
+        status, headers, draft = super().create_draft(body)
+        return status, headers, dict(draft, links={})
+
+
+class MalformedDraftAPI(StubRecordsAPI):
+    """Stub records API answering the POST of record R1 without a draft."""
+
+    def create_draft(self, body):
+        """Answer R1 with a list and store nothing."""
+        if json.loads(body)['metadata']['title'] == 'R1':
+            return 201, {}, [{'message': 'Created'}]
+        return super().create_draft(body)
+
+
+class FailingPublishAPI(StubRecordsAPI):
+    """Stub records API refusing every publication."""
+
+    def publish(self, pid):
+        """Answer with a 400 and keep the draft."""
+        return 400, {}, {'status': 400, 'message': 'Missing metadata'}
+
+
+class FailingDeletesAPI(StubRecordsAPI):
+    """Stub records API failing every deletion."""
+
+    def handle(self, method, path, headers, body):
+        """Answer deletions with a 500."""
+        if method == 'DELETE':
+            return 500, {}, {'status': 500}
+        return super().handle(method, path, headers, body)
+
+
+def test_ingest_reports_malformed_drafts(tmp_path):
+    """A response which is not a draft fails its record only."""
+    directory, output = tmp_path / 'records', tmp_path / 'map.json'
+    write_fixtures(directory, 3)
+
+    with running(MalformedDraftAPI()) as api:
+        result = ingest(api, directory, output)
+
+    assert result.exit_code == 1
+    assert 'Failed to post record from ' in result.output
+    assert 'uv001/record.json: Unexpected response' in result.output
+    assert 'Posted 2 of 3 records (0 unchanged, 1 failed)' in result.output
+    assert set(pidmap(output)) == set(api.drafts)
+
+
+def test_ingest_reports_publish_failures(tmp_path):
+    """Drafts which could not be published still count as posted."""
+    directory, output = tmp_path / 'records', tmp_path / 'map.json'
+    write_fixtures(directory, 3)
+
+    with running(FailingPublishAPI()) as api:
+        result = ingest(api, directory, output, '-p')
+
+    assert result.exit_code == 1
+    assert 'Posted 3 of 3 records (0 unchanged)' in result.output
+    assert 'Published 0 records (3 failed)' in result.output
+    assert len(api.drafts) == 3
+    assert all(entry['state'] == 'draft'
+               for entry in pidmap(output).values())
+
+
+def test_ingest_publishes(api, tmp_path):
+    """Drafts are published and journaled as published."""
+    directory, output = tmp_path / 'records', tmp_path / 'map.json'
+    write_fixtures(directory, 4)
+
+    result = ingest(api, directory, output, '-p')
+
+    assert result.exit_code == 0
+    assert 'Published 4 records' in result.output
+    assert len(api.records) == 4 and not api.drafts
+    assert all(entry['state'] == 'published'
+               for entry in pidmap(output).values())
+
+
+def test_ingest_publishes_leftover_drafts(api, tmp_path):
+    """Unchanged drafts of an earlier run are published without a POST."""
+    directory, output = tmp_path / 'records', tmp_path / 'map.json'
+    write_fixtures(directory, 3)
+    ingest(api, directory, output)
+
+    result = ingest(api, directory, output, '-p')
+
+    assert result.exit_code == 0
+    assert 'Posted 0 of 3 records (3 unchanged)' in result.output
+    assert 'Published 3 records' in result.output
+    assert api.stats['POST', 201] == 3
+    assert len(api.records) == 3
+
+
+def test_ingest_publishes_drafts_without_links(tmp_path):
+    """Drafts are published even if the API sent no publish link."""
+    directory, output = tmp_path / 'records', tmp_path / 'map.json'
+    write_fixtures(directory, 2)
+
+    with running(NoLinksAPI()) as api:
+        result = ingest(api, directory, output, '-p')
+
+    assert result.exit_code == 0
+    assert len(api.records) == 2
+
+
+def test_ingest_keeps_edited_published(api, tmp_path):
+    """Editing a published fixture posts a draft and keeps the record."""
+    directory, output = tmp_path / 'records', tmp_path / 'map.json'
+    files = write_fixtures(directory, 2)
+    ingest(api, directory, output, '-p')
+    published = set(api.records)
+
+    files[0].write_text(json.dumps({'metadata': {'title': 'Edited'}}))
+    result = ingest(api, directory, output)
+
+    assert result.exit_code == 0
+    assert set(api.records) == published
+    entries = pidmap(output)
+    draft_pid, = api.drafts
+    assert entries[draft_pid]['file'] == 'uv000/record.json'
+    kept = [entries[pid] for pid in published
+            if 'file' not in entries[pid]]
+    assert kept == [{'uv_id': 'uv000', 'state': 'published'}]
+
+    # Purging deletes the draft and keeps every published record.
+    result = purge(api, directory, output)
+
+    assert result.exit_code == 0
+    assert 'Deleted 1 of 1 drafts (2 published records kept)' \
+        in result.output
+    assert not api.drafts
+    assert set(pidmap(output)) == published
+
+
+def test_purge_batches_removals(api, tmp_path, monkeypatch):
+    """Deleted drafts, or drafts already gone, leave the map in batches."""
+    directory, output = tmp_path / 'records', tmp_path / 'map.json'
+    write_fixtures(directory, 5)
+    ingest(api, directory, output)
+    # Deleted behind the command's back: the API answers a 404.
+    api.drafts.popitem()
+
+    batches = []
+    remove_many = PIDMap.remove_many
+
+    def spy(self, pids):
+        batches.append(len(pids))
+        return remove_many(self, pids)
+
+    monkeypatch.setattr(fixtures.config, 'DEFAULT_PURGE_BATCH_SIZE', 2)
+    monkeypatch.setattr(PIDMap, 'remove_many', spy)
+    result = purge(api, directory, output)
+
+    assert result.exit_code == 0
+    assert 'Deleted 5 of 5 drafts' in result.output
+    assert batches == [2, 2, 1]
+    assert api.stats['DELETE', 404] == 1
+    assert not api.drafts and pidmap(output) == {}
+
+
+def test_purge_reports_failures(tmp_path):
+    """Drafts which could not be deleted are reported and kept."""
+    directory, output = tmp_path / 'records', tmp_path / 'map.json'
+    write_fixtures(directory, 3)
+
+    with running(FailingDeletesAPI()) as api:
+        ingest(api, directory, output)
+        result = purge(api, directory, output)
+
+    assert result.exit_code == 1
+    assert 'Deleted 0 of 3 drafts' in result.output
+    assert '500: 3 failed' in result.output
+    assert set(pidmap(output)) == set(api.drafts)
+
+
+def test_fixtures_token_falls_back(monkeypatch):
+    """The token comes from the CLI if the app factory cannot be imported."""
+    from ultraviolet_cli import identities
+
+    def create_app():
+        raise ImportStringError('invenio_app.factory.create_api',
+                                ImportError('no module'))
+
+    monkeypatch.setattr(identities.utils, 'token_from_user',
+                        lambda email, name: f'{name} of {email}')
+    identities.clear()
+    info = ScriptInfo(create_app=create_app)
+    with click.Context(fixtures.fixtures, obj=info):
+        token = fixtures.fixtures_token()
+    identities.clear()
+
+    user = fixtures.config.DEFAULT_FIXTURES_USER
+    assert token == f'default-su-token of {user}'
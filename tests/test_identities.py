@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Tests for the identity cache."""
+
+import pytest
+
+from ultraviolet_cli import identities
+from ultraviolet_cli.identities import LRUCache
+
+
+def test_lru_cache_evicts_least_recent():
+    """Test that the least recently used entry is evicted first."""
+    cache = LRUCache(maxsize=2)
+    calls = []
+
+    def factory(value):
+        return lambda: calls.append(value) or value
+
+    cache.get('a', factory(1))
+    cache.get('b', factory(2))
+    assert cache.get('a', factory(3)) == 1
+    cache.get('c', factory(4))
+    assert cache.get('b', factory(5)) == 5
+    assert calls == [1, 2, 4, 5]
+    assert len(cache) == 2
+
+
+def test_lru_cache_does_not_cache_failures():
+    """Test that a failed lookup is retried and can be invalidated."""
+    cache = LRUCache()
+
+    def missing():
+        raise LookupError()
+
+    with pytest.raises(LookupError):
+        cache.get('a', missing)
+    assert cache.get('a', lambda: 1) == 1
+
+    cache.invalidate(lambda key: key == 'a')
+    assert cache.get('a', lambda: 2) == 2
+
+
+def test_mint_token_reuses_personal_token(app, db):
+    """Test that a second token request returns the existing token."""
+    datastore = app.extensions['security'].datastore
+    datastore.create_user(email='minter@uv.test', password='123456',
+                          active=True)
+    db.session.commit()
+
+    identities.clear()
+    token = identities.mint_token('minter@uv.test', name='test-token')
+    assert token
+    assert identities.mint_token('minter@uv.test', name='test-token') == token
+    assert identities.mint_token('minter@uv.test', name='other') != token
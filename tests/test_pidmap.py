@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Tests for the fixture PID map."""
+
+import json
+import os
+
+from ultraviolet_cli.pidmap import PIDMap
+
+
+def test_pidmap_replays_journal(tmp_path):
+    """Test that an unclosed map is rebuilt from its journal."""
+    path = str(tmp_path / 'map.json')
+    pidmap = PIDMap(path, compact_every=100)
+    pidmap.put('abc-123', 'uv1')
+    pidmap.put('def-456', 'uv2')
+    pidmap.remove('abc-123')
+
+    # Simulate a run that died while writing a journal line.
+    pidmap._journal.write('{"op": "put", "pi')
+    pidmap._journal.flush()
+
+    reloaded = PIDMap(path)
+    assert reloaded.items() == [('def-456', 'uv2')]
+    reloaded.close()
+
+    with open(path) as f:
+        assert json.load(f) == {'def-456': 'uv2'}
+    assert not os.path.exists(reloaded.journal_path)
+
+
+def test_pidmap_compacts(tmp_path):
+    """Test that the snapshot is rewritten every ``compact_every`` changes."""
+    path = str(tmp_path / 'map.json')
+    pidmap = PIDMap(path, compact_every=2)
+    pidmap.put('abc-123', 'uv1')
+    assert not os.path.exists(path)
+
+    pidmap.put('def-456', 'uv2')
+    with open(path) as f:
+        assert json.load(f) == {'abc-123': 'uv1', 'def-456': 'uv2'}
+    assert os.path.getsize(pidmap.journal_path) == 0
+
+
+def test_pidmap_remove_many(tmp_path):
+    """Test that a batch of removals is journaled in one write."""
+    path = str(tmp_path / 'map.json')
+    pidmap = PIDMap(path, compact_every=100)
+    for pid in ('a', 'b', 'c'):
+        pidmap.put(pid, pid.upper())
+    pidmap.remove_many(['a', 'c', 'missing'])
+    assert pidmap.items() == [('b', 'B')]
+
+    with open(pidmap.journal_path) as f:
+        assert len(f.readlines()) == 5
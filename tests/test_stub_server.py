@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Stub records API tests."""
+
+import requests
+
+from ultraviolet_cli.stub_server import StubRecordsAPI, running
+
+HEADERS = {'authorization': 'Bearer token'}
+
+
+def test_draft_lifecycle():
+    """Drafts can be created, published and deleted."""
+    with running() as api:
+        draft = requests.post(api.base_url, json={'metadata': {}},
+                              headers=HEADERS).json()
+        assert draft['id'] in api.drafts
+
+        res = requests.post(draft['links']['publish'], headers=HEADERS)
+        assert res.status_code == 202
+        assert draft['id'] in api.records
+
+        other = requests.post(api.base_url, json={}, headers=HEADERS).json()
+        url = f'{api.base_url}/{other["id"]}/draft'
+        assert requests.delete(url, headers=HEADERS).status_code == 204
+        assert requests.delete(url, headers=HEADERS).status_code == 404
+        assert requests.post(api.base_url).status_code == 401
+
+    assert api.stats['POST', 201] == 2
+    assert api.stats['DELETE', 404] == 1
+
+
+def test_throttling():
+    """Requests above the rate limit get a 429 with Retry-After."""
+    with running(StubRecordsAPI(rate_limit=2, retry_after=3)) as api:
+        responses = [requests.get(api.base_url) for _ in range(10)]
+    throttled = [res for res in responses if res.status_code == 429]
+    # The burst may straddle two one-second windows.
+    assert len(throttled) >= 6
+    for res in throttled:
+        assert res.headers['retry-after'] == '3'
+
+
+def test_errors():
+    """A share of the requests fail with the error status."""
+    api = StubRecordsAPI(error_rate=1, error_status=500)
+    with running(api):
+        assert requests.get(api.base_url).status_code == 500
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Tests for upload helpers."""
+
+import hashlib
+import os
+
+import pytest
+from invenio_files_rest.models import Bucket, Location, ObjectVersion, Part
+from invenio_files_rest.storage import PyFSFileStorage
+
+from ultraviolet_cli import uploads
+from ultraviolet_cli.uploads import SHA256_TAG, FileWindow, GiB, MiB, \
+    build_manifest, chunk_size_for, file_checksum, find_multipart, \
+    resolve_conflicts, upload_files_batched, upload_multipart, \
+    upload_part_batch, validate_chunk_size
+
+
+@pytest.fixture()
+def bucket(db, tmp_path):
+    """Return a bucket stored in a temporary directory."""
+    location = Location(name='test', uri=str(tmp_path / 'storage'),
+                        default=True)
+    db.session.add(location)
+    db.session.commit()
+    bucket = Bucket.create(location)
+    db.session.commit()
+    return bucket
+
+
+@pytest.fixture()
+def source(tmp_path):
+    """Return the path and data of a file of six 5 MiB parts."""
+    data = os.urandom(27 * MiB)
+    path = tmp_path / 'source.bin'
+    path.write_bytes(data)
+    return str(path), data
+
+
+def test_file_window(tmp_path):
+    """Test that a window only reads its own slice of the file."""
+    path = tmp_path / 'data.bin'
+    path.write_bytes(bytes(range(100)))
+
+    with open(path, 'rb') as f:
+        window = FileWindow(f.fileno(), 10, 20)
+        assert window.read(5) == bytes(range(10, 15))
+        assert window.tell() == 5
+        assert window.read() == bytes(range(15, 30))
+        assert window.read(1) == b''
+
+        assert FileWindow(f.fileno(), 90, 20).read(100) == \
+            bytes(range(90, 100))
+
+
+def test_chunk_size_for(base_app):
+    """Test that chunk sizes respect the part count and size limits."""
+    with base_app.app_context():
+        assert chunk_size_for(100 * MiB, max_parts=1000) == 5 * MiB
+        assert chunk_size_for(1024 * GiB, max_parts=1000) == 1049 * MiB
+        assert chunk_size_for(1025 * GiB, max_parts=205) == 5 * GiB
+        assert chunk_size_for(1024 * GiB, max_parts=10 ** 6) == \
+            chunk_size_for(1024 * GiB, max_parts=10000)
+
+
+@pytest.mark.parametrize('file_size,max_parts', [
+    (1024 * GiB, 1),
+    (1024 * GiB, 204),
+    (100 * 1024 * GiB, 10 ** 6),
+])
+def test_chunk_size_for_too_many_parts(base_app, file_size, max_parts):
+    """Test that files needing too many parts of the maximum size fail."""
+    with base_app.app_context():
+        with pytest.raises(ValueError, match='do not fit in'):
+            chunk_size_for(file_size, max_parts=max_parts)
+
+
+@pytest.mark.parametrize('chunk_size,file_size,error', [
+    (5 * MiB, 100 * MiB, None),
+    (1 * MiB, 100 * MiB, 'minimum part size'),
+    (6 * GiB, 100 * GiB, 'maximum part size'),
+    (5 * MiB, 100 * GiB, 'more than 10000 parts'),
+])
+def test_validate_chunk_size(base_app, chunk_size, file_size, error):
+    """Test that chunk sizes Invenio-Files-REST refuses are caught."""
+    with base_app.app_context():
+        if error is None:
+            validate_chunk_size(chunk_size, file_size)
+        else:
+            with pytest.raises(ValueError, match=error):
+                validate_chunk_size(chunk_size, file_size)
+
+
+def test_build_manifest(tmp_path):
+    """Test that manifests cover subdirectories with relative keys."""
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'a.txt').write_bytes(b'a')
+    (tmp_path / 'sub' / 'b.txt').write_bytes(b'bb')
+
+    manifest = build_manifest(str(tmp_path))
+    assert [(e['key'], e['size']) for e in manifest] == \
+        [('a.txt', 1), ('sub/b.txt', 2)]
+    assert manifest[0]['checksum'] is None
+
+
+def test_file_window_digests(tmp_path):
+    """Test that windows feed the data they read to their digests."""
+    path = tmp_path / 'data.bin'
+    path.write_bytes(b'abcdef')
+    md5, sha256 = hashlib.md5(), hashlib.sha256()
+
+    with open(path, 'rb') as f:
+        for offset in (0, 3):
+            window = FileWindow(f.fileno(), offset, 3, [md5, sha256])
+            while window.read(2):
+                pass
+
+    assert md5.hexdigest() == hashlib.md5(b'abcdef').hexdigest()
+    assert sha256.hexdigest() == hashlib.sha256(b'abcdef').hexdigest()
+
+
+@pytest.mark.parametrize('policy,uploaded,skipped,conflicts', [
+    ('replace', ['b.txt', 'c.txt'], ['a.txt'], []),
+    ('skip', ['c.txt'], ['a.txt', 'b.txt'], []),
+    ('rename', ['b-1.txt', 'c.txt'], ['a.txt'], []),
+    ('fail', ['c.txt'], ['a.txt'], ['b.txt']),
+])
+def test_resolve_conflicts(tmp_path, policy, uploaded, skipped, conflicts):
+    """Test conflict policies and skipping of unchanged files."""
+    for name in ('a.txt', 'b.txt', 'c.txt'):
+        (tmp_path / name).write_bytes(name.encode())
+    entries = build_manifest(str(tmp_path))
+    existing = {
+        'a.txt': (5, file_checksum(str(tmp_path / 'a.txt'))),
+        'b.txt': (5, 'md5:00000000000000000000000000000000'),
+        'b-2.txt': (1, None),
+    }
+
+    result = resolve_conflicts(entries, existing, policy)
+    assert [[e['key'] for e in group] for group in result] == \
+        [uploaded, skipped, conflicts]
+
+
+@pytest.mark.parametrize('parallel', [1, 4])
+def test_upload_multipart_resumes(bucket, source, monkeypatch, parallel):
+    """Test that a failed upload is resumed with the missing parts only."""
+    path, data = source
+    written = []
+    set_contents = Part.set_contents
+
+    def spy(self, *args, **kwargs):
+        written.append(self.part_number)
+        return set_contents(self, *args, **kwargs)
+
+    def failing(app, upload_id, path, numbers, *args):
+        if 2 in numbers:
+            raise IOError('Storage unavailable')
+        return upload_part_batch(app, upload_id, path, numbers, *args)
+
+    monkeypatch.setattr(Part, 'set_contents', spy)
+    monkeypatch.setattr(uploads, 'upload_part_batch', failing)
+    with pytest.raises(IOError):
+        upload_multipart(bucket, 'data.bin', path, chunk_size=5 * MiB,
+                         parallel=parallel, batch_size=2)
+    first = set(written)
+    # The batch after the failed one may or may not have run.
+    assert {0, 1} <= first <= {0, 1, 4, 5}
+
+    assert find_multipart(bucket, 'data.bin', len(data), 5 * MiB)
+    assert not find_multipart(bucket, 'data.bin', len(data), 6 * MiB)
+
+    written.clear()
+    monkeypatch.setattr(uploads, 'upload_part_batch', upload_part_batch)
+    obj = upload_multipart(bucket, 'data.bin', path, chunk_size=5 * MiB,
+                           parallel=parallel, batch_size=2)
+
+    assert sorted(written) == sorted(set(range(6)) - first)
+    assert obj.file.checksum == f'md5:{hashlib.md5(data).hexdigest()}'
+    assert obj.get_tags()[SHA256_TAG] == hashlib.sha256(data).hexdigest()
+    with obj.file.storage().open() as f:
+        assert f.read() == data
+    assert not find_multipart(bucket, 'data.bin', len(data), 5 * MiB)
+
+
+@pytest.mark.parametrize('parallel', [1, 4])
+def test_upload_multipart_checksums(bucket, source, monkeypatch, parallel):
+    """Test that checksums are stored without reading the storage again."""
+    path, data = source
+
+    def checksum(self, *args, **kwargs):
+        raise AssertionError('The merged file was read from storage')
+
+    monkeypatch.setattr(PyFSFileStorage, 'checksum', checksum)
+    obj = upload_multipart(bucket, 'data.bin', path, chunk_size=5 * MiB,
+                           parallel=parallel, batch_size=2)
+
+    assert obj.file.checksum == f'md5:{hashlib.md5(data).hexdigest()}'
+    assert obj.get_tags()[SHA256_TAG] == hashlib.sha256(data).hexdigest()
+    assert obj.file.size == len(data)
+    assert obj.is_head and not find_multipart(bucket, 'data.bin',
+                                              len(data), 5 * MiB)
+
+
+def test_upload_files_batched(db, bucket, tmp_path):
+    """Test that small files uploaded in parallel all count to the bucket."""
+    directory = tmp_path / 'files'
+    for number in range(9):
+        path = directory / f'dir{number % 3}' / f'file{number}.txt'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(os.urandom(1000 + number))
+    entries = build_manifest(str(directory))
+
+    for batch in upload_files_batched(bucket, entries, parallel=4,
+                                      batch_size=2):
+        db.session.commit()
+        assert all(obj.key == entry['key'] for entry, obj in batch)
+
+    bucket = Bucket.get(bucket.id)
+    db.session.refresh(bucket)
+    assert bucket.size == sum(entry['size'] for entry in entries)
+    objects = {obj.key: obj for obj in ObjectVersion.get_by_bucket(bucket)}
+    assert sorted(objects) == [entry['key'] for entry in entries]
+    for entry in entries:
+        with open(entry['path'], 'rb') as f:
+            data = f.read()
+        obj = objects[entry['key']]
+        assert obj.file.checksum == f'md5:{hashlib.md5(data).hexdigest()}'
+        assert obj.get_tags()[SHA256_TAG] == \
+            hashlib.sha256(data).hexdigest()
+        with obj.file.storage().open() as f:
+            assert f.read() == data
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Tests for the command helpers."""
+
+import json
+
+import click
+import pytest
+
+from ultraviolet_cli.utils import read_manifest
+
+
+def test_read_manifest_csv(tmp_path):
+    """Test that empty CSV fields are dropped."""
+    manifest = tmp_path / 'communities.csv'
+    manifest.write_text(
+        'name,desc,owner\n'
+        'physics, Physics data ,\n'
+        'history,History data,historian@nyu.edu\n'
+    )
+    assert read_manifest(str(manifest)) == [
+        {'name': 'physics', 'desc': 'Physics data'},
+        {'name': 'history', 'desc': 'History data',
+         'owner': 'historian@nyu.edu'},
+    ]
+
+
+def test_read_manifest_json(tmp_path):
+    """Test that JSON manifests are read as a list of rows."""
+    rows = [{'name': 'physics', 'desc': 'Physics data'}]
+    manifest = tmp_path / 'communities.json'
+    manifest.write_text(json.dumps(rows))
+    assert read_manifest(str(manifest)) == rows
+
+
+def test_read_manifest_yaml(tmp_path):
+    """Test that YAML manifests are read as a list of rows."""
+    manifest = tmp_path / 'communities.yaml'
+    manifest.write_text('- name: physics\n  desc: Physics data\n')
+    assert read_manifest(str(manifest)) == [
+        {'name': 'physics', 'desc': 'Physics data'},
+    ]
+
+
+def test_read_manifest_unsupported(tmp_path):
+    """Test that unknown extensions are rejected."""
+    manifest = tmp_path / 'communities.txt'
+    manifest.write_text('physics')
+    with pytest.raises(click.ClickException):
+        read_manifest(str(manifest))
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Tests for fixture validation."""
+
+import json
+
+import pytest
+
+from ultraviolet_cli.validation import ValidationCache, json_pointer, \
+    summarize, validate_files
+
+SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'metadata': {
+            'type': 'object',
+            'properties': {'title': {'type': 'string'}},
+        },
+    },
+}
+
+
+@pytest.fixture()
+def records(tmp_path):
+    """Write one valid, one invalid and one unparsable record."""
+    files = []
+    for name, content in (('valid', '{"metadata": {"title": "A"}}'),
+                          ('invalid', '{"metadata": {"title": 3}}'),
+                          ('broken', '{"metadata":')):
+        path = tmp_path / f'{name}.json'
+        path.write_text(content)
+        files.append(str(path))
+    return files
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_validate_files(records, jobs):
+    """Test that results keep input order with and without a pool."""
+    results = list(validate_files(records, SCHEMA, jobs=jobs, chunk_size=1))
+    assert [file for file, _ in results] == records
+
+    summary = summarize(results)
+    assert (summary['total'], summary['passed'], summary['failed']) == \
+        (3, 1, 2)
+    assert summary['failures'][0]['errors'][0]['pointer'] == \
+        '/metadata/title'
+    assert summary['failures'][1]['errors'][0]['pointer'] == ''
+    json.dumps(summary)
+
+
+def test_json_pointer():
+    """Test escaping of JSON pointer parts."""
+    assert json_pointer(['a/b', 'c~d', 0]) == '/a~1b/c~0d/0'
+
+
+def test_validation_cache(records, tmp_path):
+    """Test that only changed files are validated again."""
+    path = str(tmp_path / 'cache' / 'validation.json')
+    cache = ValidationCache(path, SCHEMA)
+    first = list(validate_files(records, SCHEMA, cache=cache))
+    cache.save()
+
+    cache = ValidationCache(path, SCHEMA)
+    assert all(cache.lookup(file)[1] is not None for file in records)
+
+    with open(records[1], 'w') as f:
+        f.write('{"metadata": {"title": "Fixed"}}')
+    assert cache.lookup(records[1])[1] is None
+    second = list(validate_files(records, SCHEMA, cache=cache))
+    assert second[0] == first[0]
+    assert second[1] == (records[1], [])
+
+    # A different schema invalidates every cached result.
+    cache = ValidationCache(path, dict(SCHEMA, required=['metadata']))
+    assert cache.lookup(records[0])[1] is None
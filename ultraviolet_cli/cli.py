@@ -7,17 +7,30 @@
 
 """Invenio module for custom UltraViolet commands."""
 
-from invenio_app.factory import create_app
-
-from .commands.create_communities import create_communities
-from .commands.delete_record import delete_record
-from .commands.fixtures import fixtures
-from .commands.upload_files import upload_files
 from .utils import create_cli
 
-cli = create_cli(create_app=create_app)
-
-cli.add_command(fixtures)
-cli.add_command(create_communities)
-cli.add_command(delete_record)
-cli.add_command(upload_files)
+cli = create_cli(
+    create_app='invenio_app.factory:create_app',
+    lazy_commands={
+        'batch': (
+            'ultraviolet_cli.commands.batch:batch',
+            'Run ultraviolet-cli command lines in one app.',
+        ),
+        'create-communities': (
+            'ultraviolet_cli.commands.create_communities:create_communities',
+            'Create a community for Ultraviolet.',
+        ),
+        'delete-record': (
+            'ultraviolet_cli.commands.delete_record:delete_record',
+            'Delete Record from Ultraviolet.',
+        ),
+        'fixtures': (
+            'ultraviolet_cli.commands.fixtures:fixtures',
+            'An entry point for fixtures subcommands, e.g., ingest, purge.',
+        ),
+        'upload-files': (
+            'ultraviolet_cli.commands.upload_files:upload_files',
+            'Upload file for a draft.',
+        ),
+    },
+)
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Pooled HTTP client for the Invenio REST API helpers."""
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import config
+
+RETRY_STATUSES = (429, 502, 503, 504)
+"""Statuses of idempotent requests retried with backoff.
+
+Plain 500s are left out since the request may have been partly applied.
+"""
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'DELETE'])
+"""Methods retried after read errors and on any of ``RETRY_STATUSES``."""
+
+
+class APIRetry(Retry):
+    """Retry policy which never resends a POST the API may have handled.
+
+    A POST that timed out or got a gateway error may still have created a
+    draft, so it is only retried when it could not connect or was throttled
+    with a 429. Read errors are left alone since POST is not one of the
+    ``allowed_methods``.
+
+    Retries are sent by urllib3, below the session, so they also wait for a
+    slot of the session's ``rate_limiter``, if any.
+    """
+
+    def __init__(self, *args, rate_limiter=None, **kwargs):
+        """Retry policy initialization."""
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter
+
+    def new(self, **kwargs):
+        """Return a copy of the policy, sharing its rate limiter."""
+        kwargs.setdefault('rate_limiter', self.rate_limiter)
+        return super().new(**kwargs)
+
+    def sleep(self, response=None):
+        """Back off before a retry, then wait for the rate limit."""
+        super().sleep(response)
+        if self.rate_limiter:
+            self.rate_limiter.wait()
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        """Return whether a response with ``status_code`` is retried."""
+        if method and method.upper() not in self.allowed_methods:
+            return status_code == 429
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class RateLimiter(object):
+    """Space out calls to :meth:`wait` to at most ``rate`` per second.
+
+    Calls may come from any number of threads.
+    """
+
+    def __init__(self, rate):
+        """Limiter initialization."""
+        self.interval = 1.0 / rate
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the next slot is due."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class APISession(requests.Session):
+    """Requests session with a default timeout and an optional rate limit."""
+
+    def __init__(self, timeout=None, rate=None):
+        """Session initialization."""
+        super().__init__()
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(rate) if rate else None
+
+    def request(self, method, url, **kwargs):
+        """Send a request, applying the session timeout if none is given."""
+        if self.rate_limiter:
+            self.rate_limiter.wait()
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def create_session(pool_size=config.DEFAULT_HTTP_POOL_SIZE,
+                   timeout=config.DEFAULT_HTTP_TIMEOUT,
+                   retries=config.DEFAULT_HTTP_RETRIES,
+                   backoff=config.DEFAULT_HTTP_BACKOFF,
+                   rate=None,
+                   verify=False):
+    """Create a keep-alive session for the REST API.
+
+    :param pool_size: Number of connections kept open per host. Size it to
+        the number of threads sharing the session.
+    :param timeout: Default ``(connect, read)`` timeout in seconds.
+    :param retries: Retries on connection errors, and of idempotent requests
+        on read errors and ``RETRY_STATUSES``. POSTs are only retried on
+        connection errors and 429s, see :class:`APIRetry`.
+    :param backoff: Exponential backoff factor between retries. A
+        ``Retry-After`` header sent with a 429 takes precedence.
+    :param rate: Maximum number of requests per second, retries included,
+        across all threads sharing the session. Unlimited if ``None``.
+    :param verify: Whether to verify TLS certificates.
+    :returns: A :class:`APISession`.
+    """
+    session = APISession(timeout=timeout, rate=rate)
+    retry = APIRetry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=IDEMPOTENT_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+        rate_limiter=session.rate_limiter,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+
+    session.verify = verify
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+_default_session = None
+
+
+def default_session():
+    """Return the process-wide session used when none is passed in."""
+    global _default_session
+    if _default_session is None:
+        _default_session = create_session()
+    return _default_session
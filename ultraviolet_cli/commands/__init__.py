@@ -5,21 +5,56 @@
 # ultraviolet-cli is free software; you can redistribute it and/or modify it
 # under the terms of the MIT License; see LICENSE file for more details.
 
-"""Invenio module for custom UltraViolet commands."""
-
-from .create_communities import create_communities
-from .delete_record import delete_record
-from .fixtures import create_record_draft, delete_record_draft, fixtures, \
-    ingest, publish_record, purge, validate
-
-__all__ = (
-    "create_communities",
-    "delete_record",
-    "create_record_draft",
-    "delete_record_draft",
-    "publish_record",
-    "fixtures",
-    "ingest",
-    "purge",
-    "validate"
-)
+"""Invenio module for custom UltraViolet commands.
+
+The command modules import large parts of Invenio, so they are only
+imported once one of their names is used.
+"""
+
+import importlib
+import sys
+import types
+
+_exports = {
+    "batch": ".batch",
+    "create_communities": ".create_communities",
+    "delete_record": ".delete_record",
+    "check_api": ".fixtures",
+    "create_record_draft": ".fixtures",
+    "delete_record_draft": ".fixtures",
+    "publish_record": ".fixtures",
+    "fixture_entry": ".fixtures",
+    "fixtures": ".fixtures",
+    "fixtures_token": ".fixtures",
+    "ingest": ".fixtures",
+    "post_fixture": ".fixtures",
+    "publish_link": ".fixtures",
+    "purge": ".fixtures",
+    "stub_server": ".fixtures",
+    "validate": ".fixtures",
+}
+
+__all__ = tuple(_exports)
+
+
+def __getattr__(name):
+    """Import the module defining ``name`` on first access."""
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(_exports[name], __name__)
+    value = globals()[name] = getattr(module, name)
+    return value
+
+
+class _Commands(types.ModuleType):
+    """Package whose commands are not replaced by their modules."""
+
+    def __setattr__(self, name, value):
+        # Importing a submodule binds it on the package, which would hide
+        # the command sharing its name.
+        if isinstance(value, types.ModuleType) and name in _exports:
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Commands
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Invenio module for custom UltraViolet commands."""
+
+import shlex
+import traceback
+
+import click
+from flask.cli import ScriptInfo
+
+PROG_NAMES = ('ultraviolet-cli', 'uv-cli')
+"""Program names allowed, and ignored, at the start of a command line."""
+
+
+def read_command_lines(script):
+    """Yield ``(line number, args)`` for the command lines of ``script``.
+
+    Blank lines and lines starting with ``#`` are skipped.
+    """
+    for number, line in enumerate(script, start=1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        args = shlex.split(line)
+        if args[0] in PROG_NAMES:
+            args = args[1:]
+        yield number, args
+
+
+def run_command_line(cli, args, info, prog_name):
+    """Run ``args`` with the command group ``cli`` and the app of ``info``.
+
+    Each command line gets a fresh app context, and with it a fresh
+    database session, of the app already loaded by ``info``.
+
+    :returns: ``True`` if the command succeeded.
+    """
+    with info.load_app().app_context():
+        try:
+            rv = cli.main(args=args, prog_name=prog_name, obj=info,
+                          standalone_mode=False)
+        except click.ClickException as e:
+            e.show()
+            return False
+        except click.Abort:
+            click.secho('Aborted!', fg='red')
+            return False
+        except SystemExit as e:
+            if isinstance(e.code, str):
+                click.secho(e.code, fg='red')
+            return not e.code
+        except Exception:
+            click.secho(traceback.format_exc(), fg='red')
+            return False
+
+    # Some commands return False or a non-zero status instead of exiting.
+    if isinstance(rv, bool):
+        return rv
+    return not isinstance(rv, int) or rv == 0
+
+
+@click.command()
+@click.argument('script', type=click.File('r'), default='-')
+@click.option('-x', '--stop-on-error', is_flag=True,
+              help='Stop at the first command which fails')
+@click.pass_context
+def batch(ctx, script, stop_on_error):
+    """Run ultraviolet-cli command lines in one app.
+
+    Reads one command line per line of SCRIPT, or of stdin if SCRIPT is not
+    given, and runs them one after the other. The Invenio app is created
+    once for all of them instead of once per command.
+    """
+    root = ctx.find_root()
+    info = ctx.ensure_object(ScriptInfo)
+    info.load_app()
+
+    total = 0
+    failed = []
+    for number, args in read_command_lines(script):
+        total += 1
+        click.secho(f'[{number}] {shlex.join(args)}', bold=True)
+        if args and args[0] == ctx.info_name:
+            click.secho('Cannot run a batch within a batch', fg='red')
+            ok = False
+        else:
+            ok = run_command_line(root.command, args, info, root.info_name)
+        if not ok:
+            failed.append(number)
+            if stop_on_error:
+                break
+
+    click.secho(
+        f'\nRan {total} command lines, {len(failed)} failed',
+        bold=True, fg='green' if not failed else 'yellow'
+    )
+    if failed:
+        click.secho(f'Failed lines: {", ".join(map(str, failed))}', fg='red')
+        raise SystemExit(1)
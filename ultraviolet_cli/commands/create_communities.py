@@ -15,14 +15,136 @@ import sys
 import click
 from flask.cli import with_appcontext
 from invenio_access.permissions import system_identity
-from invenio_access.utils import get_identity
-from invenio_accounts.models import User
 from invenio_communities.members.errors import InvalidMemberError
 from invenio_pidstore.errors import PIDAlreadyExists
 from marshmallow.exceptions import ValidationError
 
+from ultraviolet_cli import config, identities
+from ultraviolet_cli.indexing import BatchUnitOfWork, process_queues
 from ultraviolet_cli.proxies import current_app, current_communities
-from ultraviolet_cli.utils import create_community_data
+from ultraviolet_cli.utils import create_community_data, defer_indexing, \
+    read_manifest
+
+COMMUNITY_FIELDS = ("name", "desc", "type", "visibility", "policy",
+                    "owner", "add_group")
+"""Fields of a row in a community manifest."""
+
+
+def add_community_group(community, group, uow=None):
+    """Add ``group`` as a reader of ``community``."""
+    members_service = current_communities.service.members
+    members_service.add(
+        system_identity,
+        community.id,
+        {
+            "members": [
+                {"type": "group", "id": group}
+            ],
+            "role": "reader",
+            "visible": True,
+        },
+        uow=uow,
+    )
+
+
+def create_manifest_community(row, uow):
+    """Create the community described by a manifest ``row`` within ``uow``.
+
+    Any error is reported for the row alone: its changes are rolled back
+    to a savepoint, and the rest of ``uow`` is kept.
+
+    :returns: A ``(community, error)`` tuple. ``community`` is ``None`` if
+        it could not be created, and ``error`` is ``None`` on success.
+    """
+    unknown = set(row) - set(COMMUNITY_FIELDS)
+    if unknown:
+        return None, f"unknown fields {', '.join(sorted(unknown))}"
+    if not row.get("name") or not row.get("desc"):
+        return None, "needs a name and desc"
+
+    owner = row["owner"]
+    try:
+        owner_identity = identities.get_user_identity(owner)
+    except Exception:
+        return None, f"{owner} is not a valid owner"
+
+    community_data = create_community_data(
+        row["name"], row["desc"], row["type"], row["visibility"],
+        row["policy"]
+    )
+    try:
+        with uow.savepoint():
+            community = current_communities.service.create(
+                data=community_data, identity=owner_identity, uow=uow
+            )
+    except Exception as err:
+        return None, str(err) or type(err).__name__
+
+    if row.get("add_group"):
+        try:
+            with uow.savepoint():
+                add_community_group(community, row["add_group"], uow=uow)
+        except InvalidMemberError:
+            return community, (f"created with ID {community.id}, but group "
+                               f"{row['add_group']} does not exist yet")
+        except Exception as err:
+            return community, (f"created with ID {community.id}, but group "
+                               f"{row['add_group']} could not be added: "
+                               f"{str(err) or type(err).__name__}")
+    return community, None
+
+
+def create_communities_from_manifest(
+        manifest, defaults, batch_size=config.DEFAULT_COMMUNITY_BATCH_SIZE):
+    """Create a community for every row of the ``manifest`` file.
+
+    Fields missing from a row are taken from ``defaults``. Owner identities
+    come from the shared identity cache, so each owner is looked up once.
+    Rows are committed ``batch_size`` at a time and errors are reported per
+    row, once their batch is committed.
+
+    :returns: The number of rows which failed.
+    """
+    rows = read_manifest(manifest)
+    click.secho(f"Creating {len(rows)} communities...", fg="yellow")
+
+    deferred = defer_indexing(True)
+    indexers = set()
+    failed = 0
+    for start in range(0, len(rows), batch_size):
+        uow = BatchUnitOfWork(defer_indexing=deferred)
+        outcomes = []
+        for number, row in enumerate(rows[start:start + batch_size],
+                                     start=start + 1):
+            row = dict(defaults, **row)
+            label = f"Row {number} ({row.get('name') or 'unnamed'})"
+            outcomes.append((label, *create_manifest_community(row, uow)))
+
+        try:
+            uow.commit()
+        except Exception as err:
+            uow.rollback()
+            commit_error = f"not saved, the batch failed to commit: {err}"
+        else:
+            commit_error = None
+            indexers.update(uow.indexers)
+
+        for label, community, error in outcomes:
+            if community is not None and commit_error:
+                error = commit_error
+            if error:
+                click.secho(f"{label}: {error}", fg="red")
+                failed += 1
+            else:
+                click.secho(f"{label}: created with ID {community.id}",
+                            fg="green")
+    process_queues(indexers)
+
+    click.secho(
+        f"Created {len(rows) - failed} of {len(rows)} communities.",
+        fg="green" if not failed else "yellow"
+    )
+    return failed
 
 
 @click.command()
@@ -30,7 +152,6 @@ from ultraviolet_cli.utils import create_community_data
     "-d",
     "--desc",
     type=str,
-    required=True,
     help="A description of the community to be created",
 )
 @click.option(
@@ -74,16 +195,37 @@ from ultraviolet_cli.utils import create_community_data
          "needs to be created prior. Adds the given group "
          "as a reader by default.",
 )
-@click.argument('name')
+@click.option(
+    "-m",
+    "--manifest",
+    type=click.Path(exists=True, dir_okay=False),
+    help="CSV, JSON or YAML file listing communities to create, with the "
+         "fields name, desc, type, visibility, policy, owner and "
+         "add_group. Options given on the command line are used for "
+         "missing fields.",
+)
+@click.argument('name', required=False)
 @with_appcontext
 def create_communities(desc, type, visibility, policy,
-                       owner, add_group, name):
+                       owner, add_group, manifest, name):
     """Create a community for Ultraviolet."""
     current_app["SQLALCHEMY_DATABASE_URI"] = os.getenv(
         "SQLALCHEMY_DATABASE_URI",
         "postgresql+psycopg2://nyudatarepository:changeme@"
         "localhost/nyudatarepository"
     )
+    if manifest:
+        defaults = {
+            "desc": desc, "type": type, "visibility": visibility,
+            "policy": policy, "owner": owner, "add_group": add_group,
+        }
+        failed = create_communities_from_manifest(manifest, defaults)
+        sys.exit(-1 if failed else 0)
+
+    if not name or not desc:
+        raise click.UsageError("NAME and --desc are required without "
+                               "--manifest.")
+
     click.secho("Creating community...", fg="yellow")
 
     community_data = create_community_data(
@@ -96,50 +238,48 @@ def create_communities(desc, type, visibility, policy,
 
     service = current_communities.service
     try:
-        owner_identity = get_identity(
-            User.query.filter_by(email=owner).one()
-        )
+        owner_identity = identities.get_user_identity(owner)
     except Exception:
         click.secho(f"Could not get owner successfully. "
                     f"Is {owner} a valid owner?", fg="red")
         sys.exit(-1)
 
+    uow = BatchUnitOfWork(defer_indexing=defer_indexing())
     try:
-        community = service.create(data=community_data,
-                                   identity=owner_identity)
+        with uow.savepoint():
+            community = service.create(data=community_data,
+                                       identity=owner_identity, uow=uow)
     except (PIDAlreadyExists, ValidationError) as err:
         click.secho(f"Error Creating Community: {err}"
                     f"\nAborting...", fg="red")
         sys.exit(-2)
 
+    group_missing = False
+    if add_group:
+        try:
+            with uow.savepoint():
+                add_community_group(community, add_group, uow=uow)
+        except InvalidMemberError:
+            group_missing = True
+    uow.commit()
+    process_queues(uow.indexers)
+
     click.secho(f"Created community {name} successfully with ID: "
                 f"{community.id}. Optionally, you can append this "
                 f"ID to COMMUNITIES_AUTO_UPDATE list in invenio.cfg"
                 f" to setup automatic update of community group "
                 f"members.", fg="green")
+
+    if group_missing:
+        click.secho(
+            f"Group {add_group} not created yet. "
+            f"Please create group using:\n\n"
+            f"pipenv run invenio roles create {add_group}\n\n"
+            f"And then, add the role manually.",
+            fg="red"
+        )
+        return -3
     if add_group:
-        members_service = current_communities.service.members
-        try:
-            members_service.add(
-                system_identity,
-                community.id,
-                {
-                    "members": [
-                        {"type": "group", "id": add_group}
-                    ],
-                    "role": "reader",
-                    "visible": True,
-                },
-            )
-        except InvalidMemberError:
-            click.secho(
-                f"Group {add_group} not created yet. "
-                f"Please create group using:\n\n"
-                f"pipenv run invenio roles create {add_group}\n\n"
-                f"And then, add the role manually.",
-                fg="red"
-            )
-            return -3
         click.secho(
             f"Added group {add_group} successfully",
             fg="green"
@@ -11,24 +11,148 @@ import os
 import click
 from flask.cli import with_appcontext
 from invenio_access.permissions import system_identity
+from invenio_pidstore.errors import PIDDeletedError, PIDDoesNotExistError, \
+    PIDUnregistered
+from invenio_records_resources.services.errors import PermissionDeniedError, \
+    RevisionIdMismatchError
+from marshmallow.exceptions import ValidationError
+from sqlalchemy.orm.exc import NoResultFound
 
+from ultraviolet_cli import config
+from ultraviolet_cli.indexing import BatchUnitOfWork, process_queues
 from ultraviolet_cli.proxies import current_app, current_rdm_records
+from ultraviolet_cli.utils import defer_indexing
+
+ERROR_CATEGORIES = (
+    ((PIDDoesNotExistError, PIDUnregistered, NoResultFound), 'not_found'),
+    (PIDDeletedError, 'already_deleted'),
+    (PermissionDeniedError, 'permission_denied'),
+    (RevisionIdMismatchError, 'conflict'),
+    (ValidationError, 'invalid'),
+)
+"""Categories reported for the errors raised when deleting a record."""
+
+
+def error_category(error):
+    """Return the category of an ``error`` raised by a deletion."""
+    for errors, category in ERROR_CATEGORIES:
+        if isinstance(error, errors):
+            return category
+    return 'error'
+
+
+def read_pids(file):
+    """Read PIDs from ``file``, one per line, skipping blanks and comments."""
+    for line in file:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+
+def search_pids(query):
+    """Return the PIDs of all records matching the search ``query``."""
+    result = current_rdm_records.records_service.scan(
+        system_identity, params={'q': query}
+    )
+    return [hit['id'] for hit in result.hits]
+
+
+def delete_records(pids, batch_size=config.DEFAULT_DELETE_BATCH_SIZE,
+                   defer_indexing=True):
+    """Delete the records ``pids``.
+
+    Each batch of ``batch_size`` records is committed to the database at
+    once, each record in its own savepoint so that one failure does not
+    abort the batch. If the commit fails, the batch is rolled back and its
+    deletions are reported as ``commit_failed``, then the next batch is
+    deleted. With ``defer_indexing``, the records are removed from the
+    search index in bulk once all batches are committed.
+
+    :returns: An iterator of ``(pid, category, error)``. ``category`` and
+        ``error`` are ``None`` for deleted records.
+    """
+    service = current_rdm_records.records_service
+    indexers = set()
+    for start in range(0, len(pids), batch_size):
+        uow = BatchUnitOfWork(defer_indexing=defer_indexing)
+        outcomes = []
+        for pid in pids[start:start + batch_size]:
+            try:
+                with uow.savepoint():
+                    service.delete(system_identity, pid, uow=uow)
+            except Exception as error:
+                outcomes.append((pid, error_category(error), error))
+            else:
+                outcomes.append((pid, None, None))
+        try:
+            uow.commit()
+        except Exception as error:
+            uow.rollback()
+            outcomes = [
+                (pid, 'commit_failed', error) if category is None
+                else (pid, category, pid_error)
+                for pid, category, pid_error in outcomes
+            ]
+        else:
+            indexers.update(uow.indexers)
+        yield from outcomes
+    process_queues(indexers)
 
 
 @click.command()
-@click.argument('pid')
+@click.option('-f', '--file', type=click.File('r'),
+              help='File of PIDs to delete, one per line. Use - to read '
+                   'them from stdin.')
+@click.option('-q', '--query',
+              help='Delete all records matching this search query.')
+@click.option('-b', '--batch-size', type=click.IntRange(min=1),
+              default=config.DEFAULT_DELETE_BATCH_SIZE, show_default=True,
+              help='Number of records deleted per database commit')
+@click.argument('pid', nargs=-1)
 @with_appcontext
-def delete_record(pid):
+def delete_record(file, query, batch_size, pid):
     """Delete Record from Ultraviolet."""
     current_app["SQLALCHEMY_DATABASE_URI"] = os.getenv(
         "SQLALCHEMY_DATABASE_URI",
         "postgresql+psycopg2://nyudatarepository:changeme@"
         "localhost/nyudatarepository"
     )
-    try:
-        current_rdm_records.records_service.delete(system_identity, pid)
-    except Exception:
-        click.secho(f"Could not delete record: PID {pid} not found", fg="red")
-        return False
-    click.secho(f"Deleted record {pid} successfully", fg="green")
+    pids = list(pid)
+    if file:
+        pids.extend(read_pids(file))
+    if query:
+        pids.extend(search_pids(query))
+    if not pids:
+        raise click.UsageError("Give a PID, --file or --query.")
+    # Keep the first occurrence of PIDs given more than once.
+    pids = list(dict.fromkeys(pids))
+
+    failures = {}
+    deletions = delete_records(pids, batch_size, defer_indexing(True))
+    for pid, category, error in deletions:
+        if category is None:
+            click.secho(f"Deleted record {pid} successfully", fg="green")
+        elif category == 'not_found':
+            click.secho(f"Could not delete record: PID {pid} not found",
+                        fg="red")
+        else:
+            click.secho(f"Could not delete record {pid}: {category}: "
+                        f"{error}", fg="red")
+        if category is not None:
+            failures.setdefault(category, []).append(pid)
+
+    if len(pids) == 1:
+        return not failures
+
+    failed = sum(len(failed_pids) for failed_pids in failures.values())
+    click.secho(
+        f"\nDeleted {len(pids) - failed} of {len(pids)} records",
+        bold=True, fg="green" if not failures else "yellow"
+    )
+    for category, failed_pids in sorted(failures.items()):
+        click.secho(f"{category}: {len(failed_pids)} failed", fg="red")
+        for failed_pid in failed_pids:
+            click.echo(f"  {failed_pid}")
+    if failures:
+        raise SystemExit(1)
     return True
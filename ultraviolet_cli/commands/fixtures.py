@@ -9,27 +9,30 @@
 
 
 import glob
+import hashlib
 import json
 import os
-from time import sleep
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 
 import click
 import requests
-from jsonschema import Draft4Validator
+from flask.cli import ScriptInfo
 from urllib3.exceptions import InsecureRequestWarning
 
-from .. import config, utils
+from .. import client, config, validation
+from ..pidmap import PIDMap
 
 # Suppress InsecureRequestWarning warnings from urllib3.
 requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
 
 
-def create_record_draft(metadata, api, token):
-    """Create a record draft using Requests."""
-    sleep(1)
-
+def check_api(api, session=None):
+    """Exit early if the REST API at ``api`` is not reachable."""
+    session = session or client.default_session()
     try:
-        r = requests.get(api, timeout=5, verify=False)
+        r = session.get(api, timeout=5)
         r.raise_for_status()
     except requests.exceptions.RequestException as e:
         print(
@@ -37,61 +40,141 @@ def create_record_draft(metadata, api, token):
         )
         raise SystemExit(e)
 
+
+def create_record_draft(metadata, api, token, session=None):
+    """Create a record draft using Requests.
+
+    The API is not health-checked here; call :func:`check_api` once before
+    posting a batch of drafts.
+    """
+    session = session or client.default_session()
     headers = {
         'content-type': 'application/json',
         'authorization': f'Bearer {token}'
     }
 
-    response = requests.post(url=api,
-                             data=json.dumps(metadata),
-                             headers=headers,
-                             verify=False)
+    response = session.post(url=api,
+                            data=json.dumps(metadata),
+                            headers=headers)
 
     response.raise_for_status()
     return response.json()
 
 
-def delete_record_draft(pid, api, token):
-    """Delete a record draft using Requests."""
-    sleep(1)
+def post_fixture(file, api, token, session=None, known_hash=None):
+    """Post the fixture record at ``file`` as a draft unless it is unchanged.
+
+    :returns: ``(digest, draft)`` where ``digest`` is the SHA-256 of the
+        file content and ``draft`` is ``None`` if ``digest`` equals
+        ``known_hash``.
+    :raises ValueError: If the file is not JSON, or the API answered with
+        something else than a draft.
+    """
+    with open(file, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if digest == known_hash:
+        return digest, None
+    metadata = json.loads(data)
+    draft = create_record_draft(metadata, api, token, session=session)
+    if not isinstance(draft, dict) or not isinstance(draft.get('id'), str):
+        raise ValueError(f'Unexpected response to a draft POST: {draft!r}')
+    if not isinstance(draft.get('links'), dict):
+        draft['links'] = {}
+    return digest, draft
+
+
+def fixture_entry(value):
+    """Return a PID map value as a dict.
+
+    Maps written before content hashes were recorded store only the UV id.
+    """
+    if isinstance(value, dict):
+        return value
+    return {'uv_id': value}
+
+
+def delete_record_draft(pid, api, token, session=None):
+    """Delete a record draft using Requests.
+
+    The API is not health-checked here; call :func:`check_api` once before
+    deleting a batch of drafts.
+    """
+    session = session or client.default_session()
     url = '/'.join((api.strip('/'), pid, 'draft'))
 
-    try:
-        r = requests.get(api, timeout=5, verify=False)
-        r.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        print(
-            f'Couldn\'t connect to api at {api}. Is the application running?'
-        )
-        raise SystemExit(e)
-
     headers = {
         'authorization': f'Bearer {token}'
     }
 
-    try:
-        response = requests.delete(url=url, headers=headers, verify=False)
-        return response
-    except Exception as err:
-        print(f'Unable to delete draft with pid {pid}')
+    return session.delete(url=url, headers=headers)
 
 
-def publish_record(record_metadata, access_token):
+def publish_record(record_metadata, access_token, session=None):
     """Publish a record using Requests."""
-    sleep(1)
+    session = session or client.default_session()
     url = record_metadata['links']['publish']
 
     headers = {
         'authorization': f'Bearer {access_token}'
     }
 
-    response = requests.post(url=url,
-                             headers=headers,
-                             verify=False)
+    response = session.post(url=url,
+                            headers=headers)
 
+    response.raise_for_status()
     return response.json()
 
 
+def publish_link(api, pid):
+    """Return the publish action URL of the draft ``pid``."""
+    return '/'.join((api.strip('/'), pid, 'draft', 'actions', 'publish'))
+
+
+def submit_ahead(executor, fn, items, ahead):
+    """Yield ``(item, future)`` of ``fn(item)`` for ``items``, in order.
+
+    At most ``ahead`` calls are submitted to ``executor`` before their
+    results are taken. Calls still queued when the generator is closed are
+    cancelled.
+    """
+    window = deque()
+    try:
+        for item in items:
+            window.append((item, executor.submit(fn, item)))
+            if len(window) >= ahead:
+                yield window.popleft()
+        while window:
+            yield window.popleft()
+    finally:
+        for _, future in window:
+            future.cancel()
+
+
+def fixtures_token():
+    """Return a REST API token of the fixtures user.
+
+    This is the only thing the fixtures commands need the Invenio app for.
+    The app is loaded here to mint the token in-process. If that fails for
+    any reason, e.g. no app, an app factory which cannot be imported, or an
+    unreachable database, ``invenio tokens create`` is tried instead.
+    """
+    # Imported here so that commands given a token never import Invenio.
+    from .. import identities
+
+    def get_token():
+        return identities.get_user_token(
+            config.DEFAULT_FIXTURES_USER, name='default-su-token'
+        )
+
+    info = click.get_current_context().ensure_object(ScriptInfo)
+    try:
+        with info.load_app().app_context():
+            return get_token()
+    except Exception:
+        return get_token()
+
+
 @click.group()
 def fixtures():
     """An entry point for fixtures subcommands, e.g., ingest, purge."""
@@ -111,8 +194,19 @@ def fixtures():
 @click.option('-o', '--output', required=True, type=str,
               default=config.DEFAULT_FIXTURES_OUTFILE,
               help=f'Where new fixture pid mappings will be written')
-@click.option('-t', '--token', help='REST API token')
-def ingest(api, dir, output, token):
+@click.option('-t', '--token', envvar='ULTRAVIOLET_CLI_TOKEN',
+              help='REST API token. Created for the fixtures user, which '
+                   'loads the Invenio app, if not given. '
+                   'Env=ULTRAVIOLET_CLI_TOKEN')
+@click.option('-w', '--workers', type=click.IntRange(min=1),
+              default=config.DEFAULT_FIXTURES_WORKERS, show_default=True,
+              help='Number of records posted concurrently')
+@click.option('-p', '--publish', is_flag=True,
+              help='Publish drafts as soon as they are created')
+@click.option('--publish-workers', type=click.IntRange(min=1),
+              default=config.DEFAULT_FIXTURES_WORKERS, show_default=True,
+              help='Number of drafts published concurrently')
+def ingest(api, dir, output, token, workers, publish, publish_workers):
     """Post local dir of UV fixture draft records via REST API."""
     click.secho('REST API: ', nl=False, bold=True, fg='green')
     click.secho(api)
@@ -121,9 +215,7 @@ def ingest(api, dir, output, token):
     click.secho(dir)
 
     if token is None:
-        token = utils.token_from_user(
-            email=config.DEFAULT_FIXTURES_USER, name='default-su-token'
-        )
+        token = fixtures_token()
 
     click.secho('Auth Token: ', nl=False, bold=True, fg='green')
     click.secho(token)
@@ -133,23 +225,165 @@ def ingest(api, dir, output, token):
         f'\nFound {len(records)} records', nl=True, bold=True, fg='blue'
     )
 
-    results = json.loads(
-        open(output).read()
-    ) if os.path.exists(output) else {}
-
-    for file in records:
-        click.secho(f'Posting record from {file}', nl=True, fg='blue')
-        dict = json.loads(open(file).read())
-        draft = create_record_draft(dict, api, token)
-        uv_id = os.path.dirname(file).split('/')[-1]
+    pool_size = workers + (publish_workers if publish else 0)
+    session = client.create_session(pool_size=pool_size)
+    check_api(api, session=session)
 
-        results[draft['id']] = uv_id
+    def create(file):
+        """Post ``file``, journal its draft and queue its publication.
 
-        os.makedirs(os.path.dirname(output), exist_ok=True)
-        with open(output, "w") as f:
-            json.dump(results, f)
+        :returns: ``(draft, outdated, publication)`` where ``draft`` is
+            ``None`` if ``file`` is unchanged, ``outdated`` is the PID of a
+            replaced draft which could not be deleted, and ``publication``
+            is the future of the publication of the draft, if any.
+        """
+        key = os.path.relpath(file, dir)
+        uv_id = os.path.dirname(file).split('/')[-1]
+        pid, known_hash, state = posted.get(key, (None, None, None))
+        if pid is None and uv_id in legacy:
+            # Posted by an older ingest which did not record hashes.
+            return None, None, None
+
+        digest, draft = post_fixture(file, api, token, session, known_hash)
+        outdated = None
+        if draft is not None:
+            # Journal the draft right away, so that it is known to the next
+            # run even if this one is interrupted.
+            results.put(draft['id'], {
+                'uv_id': uv_id,
+                'file': key,
+                'hash': digest,
+                'state': 'draft',
+            })
+            if state == 'published':
+                # Keep track of the record, but not as this file's.
+                results.put(pid, {'uv_id': uv_id, 'state': 'published'})
+            elif pid is not None and not delete_stale(pid):
+                outdated = pid
+
+        if not publish or (draft is None and state != 'draft'):
+            return draft, outdated, None
+        # Unchanged drafts left by an earlier run are published too.
+        draft_pid = pid if draft is None else draft['id']
+        target = draft
+        if draft is None or 'publish' not in draft['links']:
+            target = {'links': {'publish': publish_link(api, draft_pid)}}
+        return draft, outdated, publisher.submit(
+            publish_draft, draft_pid, target
+        )
 
-        # record  = publish_record(draft, token)
+    def delete_stale(pid):
+        """Delete the draft ``pid`` replaced by a newer one."""
+        try:
+            res = delete_record_draft(pid, api, token, session)
+        except requests.exceptions.RequestException:
+            return False
+        if res.ok or res.status_code == 404:
+            results.remove(pid)
+            return True
+        return False
+
+    def publish_draft(pid, target):
+        """Publish the draft ``pid`` and journal it as published."""
+        publish_record(target, token, session)
+        results.put(pid, dict(results[pid], state='published'))
+
+    failures = {}
+    publish_failures = {}
+    skipped = 0
+    published = 0
+    publications = []
+    with PIDMap(output) as results, session, \
+            ThreadPoolExecutor(max_workers=publish_workers) as publisher, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        posted = {}
+        legacy = set()
+        replaced = []
+        for pid, value in results.items():
+            entry = fixture_entry(value)
+            if 'file' in entry:
+                if entry['file'] in posted:
+                    # Replaced by an interrupted run before it could delete
+                    # or untrack it.
+                    replaced.append(posted[entry['file']])
+                posted[entry['file']] = (
+                    pid, entry['hash'], entry.get('state', 'draft')
+                )
+            elif not isinstance(value, dict):
+                legacy.add(entry['uv_id'])
+        for pid, _, state in replaced:
+            if state == 'published':
+                uv_id = fixture_entry(results[pid])['uv_id']
+                results.put(pid, {'uv_id': uv_id, 'state': 'published'})
+            elif not delete_stale(pid):
+                click.secho(f'Could not delete outdated draft {pid}',
+                            nl=True, fg='yellow')
+
+        # Only a few records are posted ahead of the report, so that an
+        # interrupted run stops soon and leaves little to resume.
+        jobs = submit_ahead(executor, create, records, 2 * workers)
+        try:
+            with closing(jobs):
+                # Report in order so the output reads like a serial run.
+                for file, future in jobs:
+                    try:
+                        draft, outdated_pid, publication = future.result()
+                    except (OSError, ValueError,
+                            requests.exceptions.RequestException) as err:
+                        click.secho(
+                            f'Failed to post record from {file}: {err}',
+                            nl=True, fg='red'
+                        )
+                        failures[file] = err
+                        continue
+
+                    if publication is not None:
+                        publications.append((file, publication))
+                    if outdated_pid is not None:
+                        click.secho(
+                            f'Could not delete outdated draft {outdated_pid}',
+                            nl=True, fg='yellow'
+                        )
+                    if draft is None:
+                        skipped += 1
+                        continue
+                    click.secho(f'Posted record from {file}',
+                                nl=True, fg='blue')
+
+            for file, publication in publications:
+                try:
+                    publication.result()
+                except (ValueError,
+                        requests.exceptions.RequestException) as err:
+                    click.secho(
+                        f'Failed to publish record from {file}: {err}',
+                        nl=True, fg='red'
+                    )
+                    publish_failures[file] = err
+                    continue
+                click.secho(f'Published record from {file}',
+                            nl=True, fg='blue')
+                published += 1
+        except BaseException:
+            # Drafts left unpublished are published by the next run.
+            for _, publication in publications:
+                publication.cancel()
+            raise
+
+    failed = f', {len(failures)} failed' if failures else ''
+    click.secho(
+        f'\nPosted {len(records) - len(failures) - skipped} of '
+        f'{len(records)} records ({skipped} unchanged{failed})',
+        nl=True, bold=True, fg='green' if not failures else 'yellow'
+    )
+    if publish:
+        failed = f' ({len(publish_failures)} failed)' \
+            if publish_failures else ''
+        click.secho(f'Published {published} records{failed}',
+                    nl=True, bold=True,
+                    fg='green' if not publish_failures else 'yellow')
+    if failures or publish_failures:
+        raise SystemExit(1)
 
 
 @fixtures.command()
@@ -166,36 +400,80 @@ def ingest(api, dir, output, token):
               default=config.DEFAULT_FIXTURES_OUTFILE,
               help=f'Where new fixture pid mappings will '
                    f'be written')
-@click.option('-t', '--token', help='REST API token')
-def purge(api, dir, output, token):
+@click.option('-t', '--token', envvar='ULTRAVIOLET_CLI_TOKEN',
+              help='REST API token. Created for the fixtures user, which '
+                   'loads the Invenio app, if not given. '
+                   'Env=ULTRAVIOLET_CLI_TOKEN')
+@click.option('-w', '--workers', type=click.IntRange(min=1),
+              default=config.DEFAULT_FIXTURES_WORKERS, show_default=True,
+              help='Number of drafts deleted concurrently')
+@click.option('-r', '--rate', type=click.FloatRange(min=0, min_open=True),
+              help='Maximum number of delete requests per second, '
+                   'retries included')
+def purge(api, dir, output, token, workers, rate):
     """Delete all UV fixture draft records via REST API."""
     click.secho('REST API: ', nl=False, bold=True, fg='green')
     click.secho(api)
 
     if token is None:
-        token = utils.token_from_user(
-            email=config.DEFAULT_FIXTURES_USER, name='default-su-token'
-        )
+        token = fixtures_token()
 
     click.secho('Auth Token: ', nl=False, bold=True, fg='green')
     click.secho(token)
 
-    results = json.loads(
-        open(output).read()
-    ) if os.path.exists(output) else {}
-
-    for pid, uv_id in results.copy().items():
-        res = delete_record_draft(pid, api, token)
-        if res.ok:
-            click.secho(
-                f'Delecting draft record {uv_id} aka {pid}',
-                nl=True, bold=True, fg='blue'
-            )
-            results.pop(pid)
-
-    os.makedirs(os.path.dirname(output), exist_ok=True)
-    with open(output, "w") as f:
-        json.dump(results, f)
+    session = client.create_session(pool_size=workers, rate=rate)
+    check_api(api, session=session)
+
+    failures = {}
+    with PIDMap(output) as results, session, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        entries = results.items()
+        # Published records have no draft left to delete.
+        futures = [
+            None if fixture_entry(value).get('state') == 'published'
+            else executor.submit(delete_record_draft, pid, api, token, session)
+            for pid, value in entries
+        ]
+        kept = futures.count(None)
+
+        deleted = []
+        for (pid, value), future in zip(entries, futures):
+            uv_id = fixture_entry(value)['uv_id']
+            if future is None:
+                continue
+            try:
+                res = future.result()
+                status = res.status_code
+            except requests.exceptions.RequestException as err:
+                res, status = None, type(err).__name__
+
+            # A 404 means the draft is already gone.
+            if res is not None and (res.ok or status == 404):
+                click.secho(
+                    f'Deleted draft record {uv_id} aka {pid}',
+                    nl=True, bold=True, fg='blue'
+                )
+                deleted.append(pid)
+            else:
+                failures.setdefault(status, []).append(pid)
+
+            if len(deleted) >= config.DEFAULT_PURGE_BATCH_SIZE:
+                results.remove_many(deleted)
+                deleted = []
+        results.remove_many(deleted)
+
+    failed = sum(len(pids) for pids in failures.values())
+    click.secho(
+        f'\nDeleted {len(entries) - kept - failed} of '
+        f'{len(entries) - kept} drafts ({kept} published records kept)',
+        nl=True, bold=True, fg='green' if not failures else 'yellow'
+    )
+    for status, pids in sorted(failures.items(), key=lambda i: str(i[0])):
+        click.secho(f'{status}: {len(pids)} failed', nl=True, fg='red')
+        for pid in pids:
+            click.echo(f'  {pid}')
+    if failures:
+        raise SystemExit(1)
 
 
 @fixtures.command()
@@ -209,8 +487,40 @@ def purge(api, dir, output, token):
               default=config.DEFAULT_SCHEMA_PATH,
               help=f'Path to json schema. '
                    f'Default={config.DEFAULT_SCHEMA_PATH}')
-def validate(dir, schema_file):
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=1,
+              show_default=True,
+              help='Number of processes validating records')
+@click.option('-f', '--format', 'output_format',
+              type=click.Choice(['text', 'json']), default='text',
+              show_default=True,
+              help='Print a line per record, or only a JSON summary')
+@click.option('-q', '--quiet', is_flag=True,
+              help='Only print failing records in text format')
+@click.option('--cache/--no-cache', default=True, show_default=True,
+              help='Reuse results for files unchanged since the last run')
+@click.option('-c', '--cache-file', type=str,
+              default=config.DEFAULT_VALIDATION_CACHE,
+              help=f'Where validation results are cached. '
+                   f'Default={config.DEFAULT_VALIDATION_CACHE}')
+def validate(dir, schema_file, jobs, output_format, quiet, cache,
+             cache_file):
     """Validate local dir of fixture records against JSON schema."""
+    records = glob.glob(f'{dir}/**/*.json', recursive=True)
+    schema = validation.load_schema(schema_file)
+    cache = validation.ValidationCache(cache_file, schema) if cache else None
+    results = validation.validate_files(
+        records, schema, jobs=jobs, cache=cache
+    )
+
+    if output_format == 'json':
+        summary = validation.summarize(results)
+        if cache:
+            cache.save()
+        click.echo(json.dumps(summary, indent=2))
+        if summary['failed']:
+            raise SystemExit(1)
+        return
+
     click.secho(
         'Fixtures directory: ', nl=False, bold=True, fg='green'
     )
@@ -219,21 +529,90 @@ def validate(dir, schema_file):
     click.secho('JSON Schema: ', nl=False, bold=True, fg='green')
     click.secho(schema_file)
 
-    records = glob.glob(f'{dir}/**/*.json', recursive=True)
     click.secho(
         f'\nFound {len(records)} records',
         nl=True, bold=True, fg='blue'
     )
 
-    schema = json.loads(open(schema_file).read())
-    Draft4Validator.check_schema(schema)
-    validator = Draft4Validator(schema, format_checker=None)
+    def report(results):
+        for file, errors in results:
+            if not errors:
+                if not quiet:
+                    click.secho(f'{file} passes', nl=True, fg='blue')
+            else:
+                click.secho(f'{file} fails', nl=True, fg='red')
+                for error in errors:
+                    click.echo(
+                        f'  {error["pointer"] or "/"}: {error["message"]}'
+                    )
+            yield file, errors
+
+    summary = validation.summarize(report(results))
+    if cache:
+        cache.save()
+    click.secho(
+        f'\n{summary["passed"]} of {summary["total"]} records pass',
+        nl=True, bold=True, fg='green' if not summary['failed'] else 'red'
+    )
+    if summary['failed']:
+        raise SystemExit(1)
+
+
+@fixtures.command('stub-server')
+@click.option('-h', '--host', default='127.0.0.1', show_default=True,
+              help='Address to listen on')
+@click.option('-p', '--port', type=click.IntRange(min=0),
+              default=config.DEFAULT_STUB_SERVER_PORT, show_default=True,
+              help='Port to listen on, 0 for any free port')
+@click.option('-l', '--latency', type=click.FloatRange(min=0), default=0,
+              show_default=True, help='Mean response delay in milliseconds')
+@click.option('-j', '--jitter', type=click.FloatRange(min=0), default=0,
+              show_default=True,
+              help='Maximum deviation from the mean delay in milliseconds')
+@click.option('-e', '--error-rate', type=click.FloatRange(0, 1), default=0,
+              show_default=True, help='Share of requests which fail')
+@click.option('--error-status', type=int, default=503, show_default=True,
+              help='HTTP status of failing requests')
+@click.option('-r', '--rate-limit', type=click.IntRange(min=1),
+              help='Requests served per second before answering 429')
+@click.option('--retry-after', type=click.IntRange(min=0),
+              help='Retry-After seconds sent with 429 responses')
+@click.option('-s', '--seed', type=int,
+              help='Seed of the random failures and delays')
+def stub_server(host, port, latency, jitter, error_rate,
+                error_status, rate_limit, retry_after, seed):
+    """Serve a stub records API to load test against.
+
+    The stub answers the requests of the ingest and purge commands from
+    memory, with the given delays, failures and throttling, so that their
+    throughput and retries can be measured without an Invenio instance.
+    Statistics of the responses are printed when it is stopped.
+    """
+    # Imported here so that the other commands never import asyncio.
+    import asyncio
+
+    from ..stub_server import StubRecordsAPI
+
+    api = StubRecordsAPI(
+        latency=latency / 1000, jitter=jitter / 1000,
+        error_rate=error_rate, error_status=error_status,
+        rate_limit=rate_limit, retry_after=retry_after, seed=seed
+    )
+
+    async def serve():
+        server = await api.serve(host, port)
+        click.secho(f'Serving a stub records API at {api.base_url}',
+                    nl=True, bold=True, fg='green')
+        async with server:
+            await server.serve_forever()
 
-    for file in records:
-        dict = json.loads(open(file).read())
-        try:
-            validator.validate(dict)
-            click.secho(f'{file} passes', nl=True, fg='blue')
-        except BaseException as error:
-            click.secho(f'{file} fails', nl=True, fg='red')
-            print('An exception occurred: {}'.format(error))
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    click.secho(
+        f'\n{len(api.drafts)} drafts, {len(api.records)} records',
+        nl=True, bold=True, fg='blue'
+    )
+    for (method, status), count in sorted(api.stats.items()):
+        click.echo(f'  {method} {status}: {count}')
@@ -6,18 +6,20 @@
 # under the terms of the MIT License; see LICENSE file for more details.
 
 """Invenio module for custom UltraViolet commands."""
+import json
 import os
-import uuid
 
 import click
 from flask.cli import with_appcontext
 from invenio_db import db
-from invenio_files_rest.models import MultipartObject, Part
 from invenio_pidstore.errors import PIDDoesNotExistError
-from six import BytesIO
 
-from ultraviolet_cli.config import DEFAULT_CHUNK_SIZE
+from ultraviolet_cli.config import DEFAULT_CHUNK_SIZE, DEFAULT_MAX_PARTS, \
+    DEFAULT_PART_BATCH_SIZE
 from ultraviolet_cli.proxies import current_app, current_rdm_records
+from ultraviolet_cli.uploads import CONFLICT_POLICIES, build_manifest, \
+    chunk_size_for, resolve_conflicts, upload_files_batched, \
+    upload_multipart, validate_chunk_size
 
 
 @click.command()
@@ -33,11 +35,68 @@ from ultraviolet_cli.proxies import current_app, current_rdm_records
     "--directory",
     type=click.Path(),
     default="",
-    help="Directory with the files to be uploaded.",
+    help="Directory with the files to be uploaded, including those in "
+         "subdirectories.",
+)
+@click.option(
+    "-p",
+    "--parallel",
+    type=click.IntRange(min=1),
+    show_default=True,
+    default=1,
+    help="Number of threads uploading small files or parts of large "
+         "files.",
+)
+@click.option(
+    "-b",
+    "--batch-size",
+    type=click.IntRange(min=1),
+    show_default=True,
+    default=DEFAULT_PART_BATCH_SIZE,
+    help="Number of small files or parts committed to the database at "
+         "once.",
+)
+@click.option(
+    "-c",
+    "--chunk-size",
+    type=click.IntRange(min=1),
+    help="Part size in bytes for large files, within the part size and "
+         "part count limits of Invenio-Files-REST. By default chosen from "
+         "the file size and --max-parts.",
+)
+@click.option(
+    "-m",
+    "--max-parts",
+    type=click.IntRange(min=1),
+    show_default=True,
+    default=DEFAULT_MAX_PARTS,
+    help="Maximum number of parts a large file is split into.",
+)
+@click.option(
+    "--resume/--no-resume",
+    show_default=True,
+    default=True,
+    help="Continue incomplete uploads of large files left by earlier runs.",
+)
+@click.option(
+    "-o",
+    "--on-conflict",
+    type=click.Choice(CONFLICT_POLICIES),
+    show_default=True,
+    default="replace",
+    help="What to do with files already in the draft under the same name. "
+         "Files identical to the existing ones are always skipped.",
+)
+@click.option(
+    "--manifest",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write the manifest of uploaded files, with their checksums, to "
+         "this JSON file.",
 )
 @click.argument("pid")
 @with_appcontext
-def upload_files(file, directory, pid):
+def upload_files(file, directory, parallel, batch_size, chunk_size,
+                 max_parts, resume, on_conflict, manifest, pid):
     """Upload file for a draft."""
     current_app["SQLALCHEMY_DATABASE_URI"] = os.getenv(
         "SQLALCHEMY_DATABASE_URI",
@@ -58,22 +117,27 @@ def upload_files(file, directory, pid):
         fg="green"
     )
 
-    uploads = []
+    entries = []
     if file:
         if not os.path.exists(os.path.abspath(file)):
             click.secho(f"File {file} does not exist. Please check input.",
                         fg="red")
             return -1
-        uploads.append(os.path.abspath(file))
+        path = os.path.abspath(file)
+        entries.append({
+            "path": path,
+            "key": os.path.basename(path),
+            "size": os.stat(path).st_size,
+            "checksum": None,
+        })
     if directory:
-        if not os.path.exists(os.path.abspath(directory)):
+        if not os.path.isdir(os.path.abspath(directory)):
             click.secho(
                 f"Directory {directory} does not exist. Please check input.",
                 fg="red"
             )
             return -1
-        for item in os.listdir(directory):
-            uploads.append(os.path.join(os.path.abspath(directory), item))
+        entries.extend(build_manifest(os.path.abspath(directory)))
 
     if not file and not directory:
         click.secho(
@@ -81,59 +145,106 @@ def upload_files(file, directory, pid):
             fg="red"
         )
         return -1
-    for upload in uploads:
-        file_size = os.stat(upload).st_size
-        file_name = os.path.basename(upload)
-        if file_size < DEFAULT_CHUNK_SIZE:
-            obj = open(upload, "rb")
-        else:
-            n_chunks = int(file_size / DEFAULT_CHUNK_SIZE)
-            last_chunk = file_size % DEFAULT_CHUNK_SIZE
-            mp = MultipartObject.create(
-                draft.bucket,
-                file_name,
-                size=file_size,
-                chunk_size=DEFAULT_CHUNK_SIZE,
-            )
-            with open(upload, "rb") as f:
-                with click.progressbar(
-                    length=file_size, label=f"{file_name}:"
-                ) as bar:
-                    try:
-                        for i in range(n_chunks + 1):
-                            if i < n_chunks:
-                                part_size = DEFAULT_CHUNK_SIZE
-                            else:
-                                part_size = last_chunk
-                            data = BytesIO(f.read(part_size))
-                            Part.create(mp, i, stream=data)
-                            del data
-                            db.session.commit()
-                            bar.update(part_size)
-                    except Exception as err:
-                        db.session.rollback()
-                        click.secho(
-                            f"\nError while uploading "
-                            f"{file_name}: {err}",
-                            fg="red"
-                        )
-                        return -1
-            mp.complete()
-            db.session.commit()
-            version_id = str(uuid.uuid4())
-            obj = mp.merge_parts(version_id=version_id)
-            db.session.commit()
-        if file_name in draft.files:
-            click.secho(
-                f"{file_name} already exists in draft.", fg="yellow")
-            new_file_name = input(
-                "Press Enter to replace existing file or "
-                "type in the new file name:\n"
+
+    existing = {
+        key: (
+            record_file.object_version.file.size,
+            record_file.object_version.file.checksum,
+        )
+        for key, record_file in draft.files.items()
+    }
+    uploads, skipped, conflicts = resolve_conflicts(
+        entries, existing, on_conflict
+    )
+    if conflicts:
+        click.secho("Files already in draft:", fg="red")
+        for entry in conflicts:
+            click.secho(f"  {entry['key']}", fg="red")
+        click.secho("Nothing was uploaded.", fg="red")
+        return -1
+    if skipped:
+        click.secho(
+            f"Skipping {len(skipped)} files already in draft.", fg="yellow"
+        )
+
+    # Invenio only accepts multipart uploads larger than one chunk.
+    small = [e for e in uploads if e["size"] <= DEFAULT_CHUNK_SIZE]
+    large = [e for e in uploads if e["size"] > DEFAULT_CHUNK_SIZE]
+    click.secho(
+        f"Found {len(small)} small and {len(large)} large files.",
+        fg="green"
+    )
+    # Refuse before uploading anything rather than halfway through.
+    chunk_sizes = {}
+    for entry in large:
+        try:
+            if chunk_size:
+                validate_chunk_size(chunk_size, entry["size"])
+                chunk_sizes[entry["key"]] = chunk_size
+            else:
+                chunk_sizes[entry["key"]] = chunk_size_for(
+                    entry["size"], max_parts
+                )
+        except ValueError as err:
+            raise click.BadParameter(
+                f"{entry['key']}: {err}",
+                param_hint="'--chunk-size'" if chunk_size
+                else "'--max-parts'"
             )
-            if new_file_name:
-                file_name = new_file_name
+
+    if small:
+        with click.progressbar(length=len(small), label="Files:") as bar:
+            try:
+                for batch in upload_files_batched(
+                    draft.bucket, small, parallel=parallel,
+                    batch_size=batch_size
+                ):
+                    for entry, obj in batch:
+                        entry["checksum"] = obj.file.checksum
+                        draft.files[entry["key"]] = obj
+                    db.session.commit()
+                    bar.update(len(batch))
+            except Exception as err:
+                db.session.rollback()
+                click.secho(f"\nError while uploading files: {err}",
+                            fg="red")
+                return -1
+
+    for entry in large:
+        file_size = entry["size"]
+        file_name = entry["key"]
+        with click.progressbar(
+            length=file_size, label=f"{file_name}:"
+        ) as bar:
+            try:
+                obj = upload_multipart(
+                    draft.bucket, file_name, entry["path"],
+                    chunk_size=chunk_sizes[file_name],
+                    parallel=parallel,
+                    batch_size=batch_size,
+                    resume=resume,
+                    progress=bar.update,
+                )
+            except Exception as err:
+                db.session.rollback()
+                click.secho(
+                    f"\nError while uploading "
+                    f"{file_name}: {err}\nRun the command again to "
+                    f"upload the remaining parts.",
+                    fg="red"
+                )
+                return -1
+        entry["checksum"] = obj.file.checksum
         draft.files[file_name] = obj
         db.session.commit()
         click.secho(f"Uploaded {file_name}.", fg="green")
+
+    if manifest:
+        with open(manifest, "w") as f:
+            json.dump(
+                [{k: v for k, v in e.items() if k != "path"}
+                 for e in entries],
+                f, indent=2
+            )
     click.secho(f"Operation completed successfully.", fg="green")
     return 0
@@ -13,5 +13,22 @@ DEFAULT_FIXTURES_DIR = './fixtures/records'
 DEFAULT_SCHEMA_PATH = './fixtures/schemas/record-v4.0.0.json'
 DEFAULT_FIXTURES_OUTFILE = './tmp/fixture-map.json'
 DEFAULT_RECORDS_API_URL = 'https://127.0.0.1:5000/api/records'
+DEFAULT_FIXTURES_WORKERS = 4
+DEFAULT_PIDMAP_COMPACT_EVERY = 1000
+DEFAULT_PURGE_BATCH_SIZE = 100
+DEFAULT_DELETE_BATCH_SIZE = 100
+DEFAULT_COMMUNITY_BATCH_SIZE = 100
+DEFAULT_VALIDATE_CHUNK_SIZE = 200
+DEFAULT_VALIDATION_CACHE = './tmp/validation-cache.json'
+DEFAULT_STUB_SERVER_PORT = 5050
+
+DEFAULT_HTTP_POOL_SIZE = 10
+DEFAULT_HTTP_TIMEOUT = (5, 60)
+DEFAULT_HTTP_RETRIES = 5
+DEFAULT_HTTP_BACKOFF = 0.5
 
 DEFAULT_CHUNK_SIZE = 5*1024*1024
+DEFAULT_MAX_PARTS = 1000
+DEFAULT_PART_BATCH_SIZE = 8
+
+DEFAULT_IDENTITY_CACHE_SIZE = 256
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Per-process cache of users, identities and tokens looked up by email."""
+
+import threading
+from collections import OrderedDict
+
+import click
+from flask import has_app_context
+from invenio_access.utils import get_identity
+from invenio_accounts.models import User
+from invenio_db import db
+from invenio_oauth2server.models import Client, Token
+
+from . import config, utils
+
+
+class LRUCache(object):
+    """Thread safe mapping which keeps the ``maxsize`` most recent entries.
+
+    Failed lookups raise and are not cached, so a user created later in the
+    same process is found on the next call.
+    """
+
+    def __init__(self, maxsize=config.DEFAULT_IDENTITY_CACHE_SIZE):
+        """Cache initialization."""
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Return the number of cached entries."""
+        return len(self._entries)
+
+    def get(self, key, factory):
+        """Return the entry for ``key``, calling ``factory()`` on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        value = factory()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, match):
+        """Drop the entries whose key satisfies ``match(key)``."""
+        with self._lock:
+            for key in [key for key in self._entries if match(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+_users = LRUCache()
+"""User ids by email."""
+
+_identities = LRUCache()
+"""Identities by email."""
+
+_tokens = LRUCache()
+"""REST API tokens by ``(email, token name)``."""
+
+
+def get_user_id(email):
+    """Return the id of the user with ``email``.
+
+    Only the id is cached, since user rows do not outlive the database
+    session which loaded them.
+
+    :raises sqlalchemy.orm.exc.NoResultFound: If there is no such user.
+    """
+    return _users.get(
+        email, lambda: User.query.filter_by(email=email).one().id
+    )
+
+
+def get_user_identity(email):
+    """Return the identity, with its needs loaded, of the user ``email``."""
+    return _identities.get(
+        email, lambda: get_identity(User.query.get(get_user_id(email)))
+    )
+
+
+def mint_token(email, name='token', reuse=True):
+    """Return a personal REST API token of the user ``email``.
+
+    The token is created through the OAuth2 server models of the current
+    app, like ``invenio tokens create`` does. With ``reuse``, the newest
+    personal token the user already has under the client ``name`` is
+    returned instead of creating another one on every run.
+    """
+    user_id = get_user_id(email)
+    if reuse:
+        token = Token.query.join(
+            Client, Token.client_id == Client.client_id
+        ).filter(
+            Client.name == name,
+            Token.user_id == user_id,
+            Token.is_personal.is_(True),
+        ).order_by(Token.id.desc()).first()
+        if token is not None:
+            return token.access_token
+
+    token = Token.create_personal(name, user_id)
+    db.session.commit()
+    return token.access_token
+
+
+def get_user_token(email, name='token', cache=True):
+    """Return a REST API token named ``name`` for the user ``email``.
+
+    The token is minted in-process with :func:`mint_token` when an app
+    context is available, and with ``invenio tokens create`` otherwise.
+    With ``cache``, the token is kept for the rest of the process.
+    """
+    def create():
+        if has_app_context():
+            return mint_token(email, name)
+        token = utils.token_from_user(email=email, name=name)
+        if not token:
+            raise click.ClickException(
+                f'Could not create a token for {email}.'
+            )
+        return token
+
+    if not cache:
+        return create()
+    return _tokens.get((email, name), create)
+
+
+def invalidate(email):
+    """Forget everything cached for the user ``email``.
+
+    Call this after changing the roles of a user or revoking its tokens.
+    """
+    _users.invalidate(lambda key: key == email)
+    _identities.invalidate(lambda key: key == email)
+    _tokens.invalidate(lambda key: key[0] == email)
+
+
+def clear():
+    """Forget all cached users, identities and tokens."""
+    for cache in (_users, _identities, _tokens):
+        cache.clear()
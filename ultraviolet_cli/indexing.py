@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Bulk search indexing for commands which change many records."""
+
+from contextlib import contextmanager
+
+from invenio_records_resources.services.uow import RecordCommitOp, \
+    RecordDeleteOp, UnitOfWork
+
+
+class BatchUnitOfWork(UnitOfWork):
+    """Unit of work for a batch of service calls committed together.
+
+    With ``defer_indexing``, record commit and delete operations registered
+    with it only do their database work. The ids of the records they touch
+    are collected instead, and sent to the bulk indexing queue of their
+    indexer by :meth:`commit`, rather than each record being indexed (and
+    the index refreshed) on its own.
+    """
+
+    def __init__(self, session=None, defer_indexing=True):
+        """Unit of work initialization."""
+        super().__init__(session=session)
+        self.defer_indexing = defer_indexing
+        self._indexed = []
+        self._deleted = []
+        self.indexers = set()
+        """Indexers with queued operations, for :func:`process_queues`."""
+
+    def register(self, op):
+        """Register ``op``, taking its indexing over if deferred."""
+        indexer = getattr(op, '_indexer', None)
+        if self.defer_indexing and indexer is not None:
+            if isinstance(op, RecordDeleteOp):
+                self._deleted.append((indexer, op._record.id))
+                op._indexer = None
+            elif isinstance(op, RecordCommitOp):
+                self._indexed.append((indexer, op._record.id))
+                op._indexer = None
+        super().register(op)
+
+    @contextmanager
+    def savepoint(self):
+        """Run a block in a nested transaction.
+
+        If the block raises, its database changes are rolled back and the
+        operations it registered are dropped, while the rest of the unit of
+        work is kept.
+        """
+        marks = (len(self._operations), len(self._indexed),
+                 len(self._deleted))
+        try:
+            with self.session.begin_nested():
+                yield
+        except Exception:
+            del self._operations[marks[0]:]
+            del self._indexed[marks[1]:]
+            del self._deleted[marks[2]:]
+            raise
+
+    def commit(self):
+        """Commit the unit of work and queue its records for indexing."""
+        super().commit()
+        for queue, bulk_op in ((self._indexed, 'bulk_index'),
+                               (self._deleted, 'bulk_delete')):
+            by_indexer = {}
+            for indexer, record_id in queue:
+                by_indexer.setdefault(indexer, []).append(record_id)
+            for indexer, record_ids in by_indexer.items():
+                getattr(indexer, bulk_op)(record_ids)
+                self.indexers.add(indexer)
+
+
+def process_queues(indexers):
+    """Index everything waiting in the bulk queues of ``indexers``.
+
+    Without this, the queues are processed by the next run of the
+    ``invenio index run`` command or of its scheduled task.
+    """
+    for indexer in indexers:
+        indexer.process_bulk_queue()
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Crash-safe map of fixture draft PIDs."""
+
+import json
+import os
+import threading
+
+from . import config
+
+
+class PIDMap(object):
+    """Map of draft PIDs to fixture ids, kept as a snapshot plus a journal.
+
+    The snapshot at ``path`` is a plain JSON object, the same format the
+    fixtures commands have always written. Every change is appended as one
+    JSON line to ``<path>.journal`` and the map is rebuilt by replaying the
+    journal over the snapshot. Every ``compact_every`` changes, and on
+    :meth:`close`, the map is written to a temporary file which atomically
+    replaces the snapshot before the journal is truncated, so an
+    interrupted run never leaves a partially written map behind.
+    """
+
+    def __init__(self, path,
+                 compact_every=config.DEFAULT_PIDMAP_COMPACT_EVERY):
+        """Load the map at ``path``, creating its directory if needed."""
+        self.path = path
+        self.journal_path = f'{path}.journal'
+        self.compact_every = compact_every
+        self._entries = {}
+        self._journal = None
+        self._changes = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.load()
+
+    def __enter__(self):
+        """Use the map as a context manager which closes it on exit."""
+        return self
+
+    def __exit__(self, *exc):
+        """Compact and close the map."""
+        self.close()
+
+    def __contains__(self, pid):
+        """Return whether ``pid`` is in the map."""
+        return pid in self._entries
+
+    def __getitem__(self, pid):
+        """Return the value stored for ``pid``."""
+        return self._entries[pid]
+
+    def __len__(self):
+        """Return the number of PIDs in the map."""
+        return len(self._entries)
+
+    def get(self, pid, default=None):
+        """Return the value stored for ``pid`` or ``default``."""
+        return self._entries.get(pid, default)
+
+    def items(self):
+        """Return a copy of the ``(pid, value)`` pairs in the map."""
+        return list(self._entries.items())
+
+    def load(self):
+        """Rebuild the map from the snapshot and the journal."""
+        entries = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                entries = json.load(f)
+
+        damaged = False
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A run died halfway through writing this line.
+                        damaged = True
+                        break
+                    if entry['op'] == 'put':
+                        entries[entry['pid']] = entry['value']
+                    elif entry['op'] == 'del':
+                        entries.pop(entry['pid'], None)
+
+        self._entries = entries
+        if damaged:
+            self.compact()
+
+    def put(self, pid, value):
+        """Store ``value`` for ``pid``."""
+        with self._lock:
+            self._entries[pid] = value
+            self._append({'op': 'put', 'pid': pid, 'value': value})
+
+    def remove(self, pid):
+        """Remove ``pid`` from the map if present."""
+        self.remove_many([pid])
+
+    def remove_many(self, pids):
+        """Remove all ``pids`` from the map with a single journal write."""
+        with self._lock:
+            removed = [
+                {'op': 'del', 'pid': pid} for pid in pids
+                if self._entries.pop(pid, None) is not None
+            ]
+            if removed:
+                self._append(*removed)
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot."""
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._entries, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        # Replaying the old journal over the new snapshot is harmless, so a
+        # crash before this truncation loses nothing.
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, 'w')
+        self._changes = 0
+
+    def close(self):
+        """Compact the map and remove the emptied journal."""
+        with self._lock:
+            self.compact()
+            self._journal.close()
+            self._journal = None
+            os.remove(self.journal_path)
+
+    def _append(self, *entries):
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a')
+        self._journal.write(
+            ''.join(json.dumps(entry) + '\n' for entry in entries)
+        )
+        self._journal.flush()
+
+        self._changes += len(entries)
+        if self._changes >= self.compact_every:
+            self.compact()
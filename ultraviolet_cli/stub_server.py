@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Stub of the Invenio records REST API for load testing.
+
+Implements just enough of the records API for the fixtures commands:
+creating, publishing and deleting drafts. Responses can be delayed, a share
+of them can fail, and requests above a rate limit are throttled with 429s,
+so ingest throughput and retry behaviour can be measured offline.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
+REASONS = {
+    200: 'OK',
+    201: 'Created',
+    202: 'Accepted',
+    204: 'No Content',
+    400: 'Bad Request',
+    401: 'Unauthorized',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    429: 'Too Many Requests',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+
+class StubRecordsAPI(object):
+    """Records API state and behaviour, served by :meth:`serve`.
+
+    :param prefix: Path of the records API.
+    :param latency: Mean delay of every response, in seconds.
+    :param jitter: Responses are delayed by ``latency`` plus or minus up to
+        ``jitter`` seconds.
+    :param error_rate: Share of requests failing with ``error_status``.
+    :param error_status: Status of failing requests.
+    :param rate_limit: Requests per second served before throttling the
+        rest with 429s. Unlimited if ``None``.
+    :param retry_after: ``Retry-After`` seconds sent with 429s, or ``None``
+        to leave the header out.
+    :param seed: Seed of the random failures and delays.
+    """
+
+    def __init__(self, prefix='/api/records', latency=0.0, jitter=0.0,
+                 error_rate=0.0, error_status=503, rate_limit=None,
+                 retry_after=None, seed=None):
+        """API initialization."""
+        self.prefix = '/' + prefix.strip('/')
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.base_url = None
+        """URL of the records API once :meth:`serve` has started."""
+        self.drafts = {}
+        self.records = {}
+        self.stats = Counter()
+        """Number of responses by ``(method, status)``."""
+        self._window = (0, 0)
+
+    def throttled(self):
+        """Return whether the current request is above the rate limit."""
+        if self.rate_limit is None:
+            return False
+        second = int(time.monotonic())
+        start, count = self._window
+        if start != second:
+            start, count = second, 0
+        self._window = (start, count + 1)
+        return count >= self.rate_limit
+
+    def handle(self, method, path, headers, body):
+        """Return ``(status, headers, body)`` for a request."""
+        if self.throttled():
+            extra = {}
+            if self.retry_after is not None:
+                extra['retry-after'] = str(self.retry_after)
+            return 429, extra, {'status': 429, 'message': 'Throttled'}
+        if self.error_rate and self.random.random() < self.error_rate:
+            return self.error_status, {}, {'status': self.error_status}
+
+        path = path.split('?')[0].rstrip('/')
+        if method == 'GET':
+            return 200, {}, {'hits': {'total': len(self.records)}}
+        if not path.startswith(self.prefix):
+            return 404, {}, {'status': 404}
+        if 'authorization' not in headers:
+            return 401, {}, {'status': 401}
+
+        parts = path[len(self.prefix):].strip('/').split('/')
+        if method == 'POST' and parts == ['']:
+            return self.create_draft(body)
+        if method == 'POST' and parts[1:] == ['draft', 'actions', 'publish']:
+            return self.publish(parts[0])
+        if method == 'DELETE' and parts[1:] == ['draft']:
+            if self.drafts.pop(parts[0], None) is None:
+                return 404, {}, {'status': 404}
+            return 204, {}, None
+        return 405, {}, {'status': 405}
+
+    def create_draft(self, body):
+        """Store a new draft with the metadata in ``body``."""
+        try:
+            metadata = json.loads(body or b'{}')
+        except ValueError:
+            return 400, {}, {'status': 400, 'message': 'Invalid JSON'}
+        pid = uuid.uuid4().hex[:10]
+        draft = dict(metadata, id=pid, links={
+            'self': f'{self.base_url}/{pid}/draft',
+            'publish': f'{self.base_url}/{pid}/draft/actions/publish',
+        })
+        self.drafts[pid] = draft
+        return 201, {}, draft
+
+    def publish(self, pid):
+        """Turn the draft ``pid`` into a record."""
+        draft = self.drafts.pop(pid, None)
+        if draft is None:
+            return 404, {}, {'status': 404}
+        self.records[pid] = dict(draft, is_published=True)
+        return 202, {}, self.records[pid]
+
+    async def respond(self, reader, writer):
+        """Serve the requests of one keep-alive connection."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                lines = head.decode('latin-1').split('\r\n')
+                method, path, _ = lines[0].split(' ', 2)
+                headers = dict(
+                    (name.strip().lower(), value.strip())
+                    for name, value in (
+                        line.split(':', 1) for line in lines[1:] if line
+                    )
+                )
+                length = int(headers.get('content-length', 0))
+                body = await reader.readexactly(length) if length else b''
+
+                delay = self.latency
+                if self.jitter:
+                    delay += self.random.uniform(-self.jitter, self.jitter)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                status, extra, payload = self.handle(method, path, headers,
+                                                     body)
+                self.stats[method, status] += 1
+                data = b'' if payload is None else json.dumps(payload).encode()
+                response = [f'HTTP/1.1 {status} {REASONS.get(status, "")}',
+                            'content-type: application/json',
+                            f'content-length: {len(data)}']
+                response += [f'{name}: {value}'
+                             for name, value in extra.items()]
+                writer.write(
+                    ('\r\n'.join(response) + '\r\n\r\n').encode() + data
+                )
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    return
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=0):
+        """Start serving and return the :class:`asyncio.Server`."""
+        server = await asyncio.start_server(self.respond, host, port)
+        host, port = server.sockets[0].getsockname()[:2]
+        self.base_url = f'http://{host}:{port}{self.prefix}'
+        return server
+
+
+@contextmanager
+def running(api=None, host='127.0.0.1', port=0):
+    """Serve ``api`` from a background thread for the duration of a block.
+
+    :returns: The :class:`StubRecordsAPI`, whose ``base_url`` is the
+        records API URL to pass to the fixtures commands.
+    """
+    api = api or StubRecordsAPI()
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(api.serve(host, port))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield api
+    finally:
+        asyncio.run_coroutine_threadsafe(shutdown(server), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+async def shutdown(server):
+    """Stop ``server`` and drop the connections clients kept open."""
+    server.close()
+    tasks = [task for task in asyncio.all_tasks()
+             if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
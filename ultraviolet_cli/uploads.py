@@ -0,0 +1,462 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Helpers for uploading files to draft buckets."""
+
+import hashlib
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from flask import current_app
+from invenio_db import db
+from invenio_files_rest.models import Bucket, FileInstance, MultipartObject, \
+    ObjectVersion, ObjectVersionTag, Part
+
+from . import config
+
+MiB = 1024 * 1024
+GiB = 1024 * MiB
+
+CONFLICT_POLICIES = ('replace', 'skip', 'rename', 'fail')
+"""What to do with files whose key already exists in the draft."""
+
+SHA256_TAG = 'checksum:sha256'
+"""Tag holding the SHA-256 checksum of uploaded objects.
+
+Invenio-Files-REST itself only stores the MD5 checksum.
+"""
+
+
+class FileWindow(object):
+    """Read-only stream over ``size`` bytes of a file, from ``offset`` on.
+
+    Reads go straight to the file descriptor ``fd`` with ``os.pread``, so
+    the window is never copied into memory as a whole, and windows sharing
+    a descriptor can be read from different threads. Every chunk read is
+    also fed to the ``hashlib`` objects in ``digests``.
+    """
+
+    def __init__(self, fd, offset, size, digests=()):
+        """Window initialization."""
+        self.fd = fd
+        self.offset = offset
+        self.size = size
+        self.digests = digests
+        self._position = 0
+
+    def read(self, n=-1):
+        """Read up to ``n`` bytes, or the rest of the window."""
+        remaining = self.size - self._position
+        if n is None or n < 0 or n > remaining:
+            n = remaining
+        if n == 0:
+            return b''
+        data = os.pread(self.fd, n, self.offset + self._position)
+        self._position += len(data)
+        for digest in self.digests:
+            digest.update(data)
+        return data
+
+    def tell(self):
+        """Return the current position within the window."""
+        return self._position
+
+
+def multipart_limits():
+    """Return the multipart upload limits of Invenio-Files-REST.
+
+    :returns: ``(min chunk size, max chunk size, max parts)``.
+    """
+    app_config = current_app.config
+    return (
+        app_config.get('FILES_REST_MULTIPART_CHUNKSIZE_MIN', 5 * MiB),
+        app_config.get('FILES_REST_MULTIPART_CHUNKSIZE_MAX', 5 * GiB),
+        app_config.get('FILES_REST_MULTIPART_MAX_PARTS', 10000),
+    )
+
+
+def chunk_size_for(file_size, max_parts=config.DEFAULT_MAX_PARTS):
+    """Return the chunk size for a multipart upload of ``file_size`` bytes.
+
+    The smallest size, rounded up to whole MiB, which splits the file into
+    at most ``max_parts`` parts, bounded by ``DEFAULT_CHUNK_SIZE`` and by
+    the chunk size and part count limits of Invenio-Files-REST.
+
+    :raises ValueError: If even parts of the maximum size split the file
+        into more than ``max_parts`` parts.
+    """
+    min_size, max_size, max_parts_allowed = multipart_limits()
+    min_size = max(config.DEFAULT_CHUNK_SIZE, min_size)
+    max_parts = min(max_parts, max_parts_allowed)
+
+    chunk_size = -(-file_size // max_parts)
+    chunk_size = -(-chunk_size // MiB) * MiB
+    chunk_size = min(max(chunk_size, min_size), max_size)
+    if -(-file_size // chunk_size) > max_parts:
+        raise ValueError(
+            f'{file_size} bytes do not fit in {max_parts} parts of at most '
+            f'{max_size} bytes.'
+        )
+    return chunk_size
+
+
+def validate_chunk_size(chunk_size, file_size):
+    """Check that ``file_size`` bytes can be uploaded in ``chunk_size`` parts.
+
+    :raises ValueError: If Invenio-Files-REST would refuse the multipart
+        upload.
+    """
+    min_size, max_size, max_parts = multipart_limits()
+    if chunk_size < min_size:
+        raise ValueError(
+            f'{chunk_size} is below the minimum part size of {min_size} '
+            f'bytes.'
+        )
+    if chunk_size > max_size:
+        raise ValueError(
+            f'{chunk_size} is above the maximum part size of {max_size} '
+            f'bytes.'
+        )
+    if file_size > chunk_size * max_parts:
+        raise ValueError(
+            f'{chunk_size} splits {file_size} bytes into more than '
+            f'{max_parts} parts.'
+        )
+
+
+def window_checksum(window, algorithm='md5'):
+    """Return the checksum of ``window`` in Invenio's ``algo:hex`` format."""
+    digest = hashlib.new(algorithm)
+    for block in iter(lambda: window.read(1024 * 1024), b''):
+        digest.update(block)
+    return f'{algorithm}:{digest.hexdigest()}'
+
+
+def hash_file(path, digests):
+    """Feed the content of the file at ``path`` to ``digests``."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        window = FileWindow(f.fileno(), 0, size, digests)
+        for _ in iter(lambda: window.read(MiB), b''):
+            pass
+
+
+def file_checksum(path, algorithm='md5'):
+    """Return the checksum of the file at ``path`` as ``algo:hex``."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        return window_checksum(FileWindow(f.fileno(), 0, size), algorithm)
+
+
+def build_manifest(directory):
+    """Return a manifest of all files below ``directory``.
+
+    :returns: A list of ``{'path', 'key', 'size', 'checksum'}`` dicts sorted
+        by ``key``, the path relative to ``directory`` with ``/`` as
+        separator. ``checksum`` is filled in while uploading.
+    """
+    manifest = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            manifest.append({
+                'path': path,
+                'key': os.path.relpath(path, directory).replace(os.sep, '/'),
+                'size': os.stat(path).st_size,
+                'checksum': None,
+            })
+    return manifest
+
+
+def unique_key(key, taken):
+    """Return ``key`` with the lowest ``-N`` suffix not in ``taken``."""
+    stem, ext = os.path.splitext(key)
+    number = 1
+    while f'{stem}-{number}{ext}' in taken:
+        number += 1
+    return f'{stem}-{number}{ext}'
+
+
+def resolve_conflicts(entries, existing, policy='replace'):
+    """Apply the conflict ``policy`` to the manifest ``entries``.
+
+    Entries whose size and checksum match the existing file of the same key
+    are skipped whatever the policy, so unchanged files are never uploaded
+    again. Local checksums are only computed for such size matches.
+
+    :param existing: Maps the keys of the files already in the draft to
+        their ``(size, checksum)``.
+    :param policy: One of ``CONFLICT_POLICIES``. ``rename`` changes the key
+        of conflicting entries to an unused one.
+    :returns: ``(uploads, skipped, conflicts)`` lists of entries, where
+        ``conflicts`` holds the entries refused by the ``fail`` policy.
+    """
+    uploads, skipped, conflicts = [], [], []
+    taken = set(existing) | {entry['key'] for entry in entries}
+    for entry in entries:
+        if entry['key'] not in existing:
+            uploads.append(entry)
+            continue
+
+        size, checksum = existing[entry['key']]
+        if size == entry['size'] and checksum:
+            algorithm = checksum.split(':', 1)[0]
+            if file_checksum(entry['path'], algorithm) == checksum:
+                entry['checksum'] = checksum
+                skipped.append(entry)
+                continue
+
+        if policy == 'skip':
+            skipped.append(entry)
+        elif policy == 'fail':
+            conflicts.append(entry)
+        elif policy == 'rename':
+            entry['key'] = unique_key(entry['key'], taken)
+            taken.add(entry['key'])
+            uploads.append(entry)
+        else:
+            uploads.append(entry)
+    return uploads, skipped, conflicts
+
+
+def upload_file_batch(app, bucket_id, entries):
+    """Store the content of the manifest ``entries``, committing once.
+
+    Runs in its own application context, and thus its own database
+    session. Only file instances are written: the objects pointing at them
+    are created by :func:`create_objects`, as they change the size of the
+    bucket, which concurrent batches must not update.
+
+    :returns: The ``(file_id, sha256)`` of each entry, in order.
+    """
+    with app.app_context():
+        try:
+            bucket = Bucket.get(bucket_id)
+            files = []
+            for entry in entries:
+                # The storage computes the MD5 checksum on its own.
+                sha256 = hashlib.sha256()
+                file_ = FileInstance.create()
+                with open(entry['path'], 'rb') as f:
+                    window = FileWindow(
+                        f.fileno(), 0, entry['size'], [sha256]
+                    )
+                    file_.set_contents(
+                        window, size=entry['size'],
+                        size_limit=bucket.size_limit,
+                        default_location=bucket.location.uri,
+                        default_storage_class=bucket.default_storage_class,
+                    )
+                files.append((file_.id, sha256.hexdigest()))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    return files
+
+
+def create_objects(bucket, entries, files):
+    """Create the objects of ``entries`` in ``bucket`` from stored files.
+
+    The bucket row is locked first, so that its size is updated from its
+    committed value and no concurrent update is lost. The caller commits.
+
+    :param files: The ``(file_id, sha256)`` of each entry, as returned by
+        :func:`upload_file_batch`.
+    :returns: The new :class:`ObjectVersion` of each entry, in order.
+    """
+    db.session.refresh(bucket, with_for_update=True)
+    objects = []
+    for entry, (file_id, sha256) in zip(entries, files):
+        obj = ObjectVersion.create(bucket, entry['key'], _file_id=file_id)
+        ObjectVersionTag.create(obj, SHA256_TAG, sha256)
+        objects.append(obj)
+    return objects
+
+
+def upload_files_batched(bucket, entries, parallel=1,
+                         batch_size=config.DEFAULT_PART_BATCH_SIZE):
+    """Upload the manifest ``entries`` to ``bucket`` concurrently.
+
+    Batches of ``batch_size`` files are stored by ``parallel`` threads.
+    The objects of every finished batch are then created in the current
+    session, which the caller commits.
+
+    :returns: An iterator over finished batches, each a list of
+        ``(entry, object_version)`` pairs.
+    """
+    app = current_app._get_current_object()
+    batches = part_batches(entries, batch_size)
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        futures = {
+            executor.submit(upload_file_batch, app, bucket.id, batch): batch
+            for batch in batches
+        }
+        try:
+            for future in as_completed(futures):
+                batch = futures[future]
+                objects = create_objects(bucket, batch, future.result())
+                yield list(zip(batch, objects))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def find_multipart(bucket, key, size, chunk_size):
+    """Return the latest incomplete multipart upload of ``key``, if any.
+
+    Only uploads of the same ``size`` and ``chunk_size`` can be resumed.
+    """
+    return MultipartObject.query.filter_by(
+        bucket_id=bucket.id,
+        key=key,
+        size=size,
+        chunk_size=chunk_size,
+        completed=False,
+    ).order_by(MultipartObject.created.desc()).first()
+
+
+def part_batches(items, batch_size):
+    """Split the sequence ``items`` into batches of ``batch_size``."""
+    return [
+        items[i:i + batch_size] for i in range(0, len(items), batch_size)
+    ]
+
+
+def upload_part_batch(app, upload_id, path, part_numbers, checksums=None,
+                      digests=None):
+    """Upload ``part_numbers`` of a multipart object from ``path``.
+
+    Runs in its own application context, and thus its own database
+    session, which is committed once for the whole batch. Parts already
+    stored with the checksum of the local data, as given by ``checksums``,
+    are not uploaded again. The data of every part is fed to ``digests``,
+    so batches sharing them must be uploaded one after another.
+
+    :returns: The number of bytes processed.
+    """
+    checksums = checksums or {}
+    digests = [] if digests is None else digests
+    with app.app_context():
+        try:
+            mp = MultipartObject.query.get(upload_id)
+            processed = 0
+            with open(path, 'rb') as f:
+                for number in part_numbers:
+                    start = number * mp.chunk_size
+                    part_size = min(mp.chunk_size, mp.size - start)
+                    processed += part_size
+
+                    checksum = checksums.get(number)
+                    if checksum:
+                        algorithm = checksum.split(':', 1)[0]
+                        seen = [digest.copy() for digest in digests]
+                        window = FileWindow(
+                            f.fileno(), start, part_size, seen
+                        )
+                        if window_checksum(window, algorithm) == checksum:
+                            digests[:] = seen
+                            continue
+
+                    window = FileWindow(f.fileno(), start, part_size, digests)
+                    Part.get_or_create(mp, number).set_contents(window)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    return processed
+
+
+def upload_multipart(bucket, key, path,
+                     chunk_size=None,
+                     parallel=1,
+                     batch_size=config.DEFAULT_PART_BATCH_SIZE,
+                     resume=True,
+                     progress=None):
+    """Upload the file at ``path`` to ``bucket`` as a multipart object.
+
+    Batches of ``batch_size`` parts are uploaded by ``parallel`` threads,
+    which stream each part from a :class:`FileWindow` on the file. With
+    ``resume``, an incomplete upload of the same file left by an earlier
+    run is continued: its stored parts are checked against the local data
+    and only missing or differing parts are uploaded.
+
+    The MD5 and SHA-256 checksums of the whole file are computed from the
+    local data and stored on the merged object, so the storage never reads
+    it again. With a single thread they are computed from the part data as
+    it is uploaded. Parts uploaded in parallel are read out of order, so
+    the local file is then read a second time, sequentially, by one more
+    thread running alongside the upload.
+
+    :param chunk_size: Part size in bytes. Chosen by
+        :func:`chunk_size_for` if not given.
+    :param progress: Called with the number of bytes of every finished
+        batch.
+    :returns: The merged :class:`ObjectVersion`.
+    """
+    size = os.stat(path).st_size
+    chunk_size = chunk_size or chunk_size_for(size)
+    mp = find_multipart(bucket, key, size, chunk_size) if resume else None
+    checksums = {}
+    if mp is None:
+        mp = MultipartObject.create(
+            bucket, key, size=size, chunk_size=chunk_size
+        )
+        # Commit so that the upload threads can see the multipart object.
+        db.session.commit()
+    else:
+        checksums = {
+            part.part_number: part.checksum
+            for part in Part.query_by_multipart(mp)
+        }
+
+    digests = [hashlib.md5(), hashlib.sha256()]
+    numbers = range(mp.last_part_number + 1)
+    app = current_app._get_current_object()
+    # A single upload thread picks the batches up in order and can feed
+    # the digests itself; otherwise one more thread hashes the file.
+    inline = parallel == 1
+    workers = parallel if inline else parallel + 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        if not inline:
+            futures.append(executor.submit(hash_file, path, digests))
+        futures.extend(
+            executor.submit(
+                upload_part_batch, app, mp.upload_id, path, batch,
+                {number: checksums.get(number) for number in batch},
+                digests if inline else None
+            )
+            for batch in part_batches(numbers, batch_size)
+        )
+        try:
+            for future in as_completed(futures):
+                processed = future.result()
+                if progress and processed:
+                    progress(processed)
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+    # Batches which skip stored parts swap the digests for updated copies.
+    md5, sha256 = digests
+    mp.complete()
+    # MultipartObject.merge_parts would have the storage read the merged
+    # file again to compute its checksum, which is known already.
+    mp.file.checksum = f'md5:{md5.hexdigest()}'
+    with db.session.begin_nested():
+        obj = ObjectVersion.create(
+            bucket, key, _file_id=mp.file_id, version_id=str(uuid.uuid4())
+        )
+        mp.delete()
+    ObjectVersionTag.create_or_update(obj, SHA256_TAG, sha256.hexdigest())
+    db.session.commit()
+    return obj
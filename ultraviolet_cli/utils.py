@@ -7,18 +7,88 @@
 
 """Invenio module for custom UltraViolet commands."""
 
+import csv
 import json
 import os
+import sys
 
 import click
+from flask import Flask
 from flask.cli import FlaskGroup
 from flask.helpers import get_debug_flag
+from werkzeug.utils import import_string
 
+if sys.version_info >= (3, 10):
+    from importlib import metadata
+else:
+    import importlib_metadata as metadata
 
-def create_cli(create_app=None):
+
+class LazyFlaskGroup(FlaskGroup):
+    """Flask group which imports its commands when they are first used.
+
+    Commands are registered by name in ``lazy_commands``, with the
+    ``'module:attribute'`` import string of the command and the short help
+    shown in ``--help``. The commands of ``flask.commands`` entry points
+    are registered the same way, without help, so listing the commands
+    imports none of them. The app is not loaded to list its own commands
+    either; they can still be run by name.
+    """
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        """Group initialization."""
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = dict(lazy_commands or {})
+
+    def _load_plugin_commands(self):
+        # Overrides FlaskGroup, which imports every plugin command.
+        if self._loaded_plugin_commands:
+            return
+        for ep in metadata.entry_points(group='flask.commands'):
+            self.lazy_commands.setdefault(ep.name, (ep.value, ''))
+        self._loaded_plugin_commands = True
+
+    def get_command(self, ctx, name):
+        """Return the command ``name``, importing it if needed."""
+        self._load_plugin_commands()
+        if name not in self.commands and name in self.lazy_commands:
+            import_path, _ = self.lazy_commands[name]
+            self.add_command(import_string(import_path), name)
+        return super().get_command(ctx, name)
+
+    def list_commands(self, ctx):
+        """Return the names of the commands without importing them."""
+        self._load_plugin_commands()
+        return sorted(set(self.commands) | set(self.lazy_commands))
+
+    def format_commands(self, ctx, formatter):
+        """List the commands in ``--help`` without importing them."""
+        names = [
+            name for name in self.list_commands(ctx)
+            if name not in self.commands or not self.commands[name].hidden
+        ]
+        if not names:
+            return
+
+        limit = formatter.width - 6 - max(len(name) for name in names)
+        rows = []
+        for name in names:
+            if name in self.commands:
+                help = self.commands[name].get_short_help_str(limit)
+            else:
+                help = self.lazy_commands[name][1]
+            rows.append((name, help))
+        with formatter.section('Commands'):
+            formatter.write_dl(rows)
+
+
+def create_cli(create_app=None, lazy_commands=None):
     """Create CLI for ``ultraviolet-cli`` command.
 
-    :param create_app: Flask application factory.
+    :param create_app: Flask application factory, or its import string to
+        import it only once an app is needed.
+    :param lazy_commands: Map of command names to the import string and
+        short help of the commands, see :class:`LazyFlaskGroup`.
     :returns: Click command group.
     """
     # Flask 2.0 removed support for passing script_info argument. Below
@@ -42,19 +112,49 @@ def create_cli(create_app=None):
                 info.create_app = None
                 app = info.load_app()
         else:
-            app = create_app(debug=get_debug_flag())
+            factory = create_app
+            if isinstance(factory, str):
+                factory = import_string(factory)
+            app = factory(debug=get_debug_flag())
         return app
 
-    @click.group(cls=FlaskGroup, create_app=create_cli_app)
-    def cli(**params):
+    @click.group(cls=LazyFlaskGroup, create_app=create_cli_app,
+                 lazy_commands=lazy_commands)
+    @click.option('--defer-indexing/--no-defer-indexing', default=None,
+                  help='Send search index updates to the bulk indexer once '
+                       'a command is done instead of indexing every record '
+                       'as it changes. By default only bulk operations '
+                       'defer indexing.')
+    @click.pass_context
+    def cli(ctx, defer_indexing, **params):
         """Command Line Interface for Ultraviolet."""
-        pass
+        ctx.meta[DEFER_INDEXING] = defer_indexing
 
     return cli
 
 
+DEFER_INDEXING = 'ultraviolet_cli.defer_indexing'
+"""Key of the ``--defer-indexing`` choice in the click context meta."""
+
+
+def defer_indexing(default=False):
+    """Return whether the running command should defer search indexing.
+
+    ``default`` applies unless ``--defer-indexing`` or
+    ``--no-defer-indexing`` was given.
+    """
+    ctx = click.get_current_context(silent=True)
+    choice = ctx.meta.get(DEFER_INDEXING) if ctx is not None else None
+    return default if choice is None else choice
+
+
 def token_from_user(email, name='token'):
-    """Create + return token for a given user."""
+    """Create + return token for a given user.
+
+    This boots a second Invenio CLI process. Prefer
+    :func:`ultraviolet_cli.identities.get_user_token`, which mints the token
+    in-process when an app context is available.
+    """
     token = os.popen(
         f'invenio tokens create --name {name} --user {email}'
     ).read().strip()
@@ -79,3 +179,27 @@ def create_community_data(name, description, type, visibility, policy):
         },
     }
     return json.loads(json.dumps(data_to_use))
+
+
+def read_manifest(path):
+    """Read a list of rows from a CSV, JSON or YAML manifest file.
+
+    The format is chosen from the file extension. JSON and YAML manifests
+    hold a list of objects, CSV manifests a header row naming the fields.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline='') as f:
+        if ext == '.csv':
+            return [
+                {k: v.strip() for k, v in row.items() if v and v.strip()}
+                for row in csv.DictReader(f)
+            ]
+        if ext in ('.yml', '.yaml'):
+            # Only imported for YAML manifests, to keep the CLI quick to load.
+            import yaml
+            return yaml.safe_load(f) or []
+        if ext == '.json':
+            return json.load(f)
+    raise click.ClickException(
+        f'Unsupported manifest format {ext!r}, use .csv, .json or .yaml.'
+    )
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 NYU Libraries.
+#
+# ultraviolet-cli is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Validation of fixture records against a JSON schema."""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from jsonschema import Draft4Validator
+
+from . import config
+
+_validator = None
+"""Validator built once per worker process by :func:`init_validator`."""
+
+
+def load_schema(schema_file):
+    """Load and check the JSON schema at ``schema_file``."""
+    with open(schema_file) as f:
+        schema = json.load(f)
+    Draft4Validator.check_schema(schema)
+    return schema
+
+
+def init_validator(schema):
+    """Build the validator used by :func:`validate_chunk`."""
+    global _validator
+    _validator = Draft4Validator(schema, format_checker=None)
+
+
+def json_pointer(path):
+    """Return the JSON pointer (RFC 6901) for a sequence of path parts."""
+    return ''.join(
+        '/' + str(part).replace('~', '~0').replace('/', '~1')
+        for part in path
+    )
+
+
+def validate_file(file, validator):
+    """Validate the record at ``file``.
+
+    :returns: A list of ``{'pointer': ..., 'message': ...}`` dicts, where
+        ``pointer`` is a JSON pointer to the offending value. The list is
+        empty if the record is valid.
+    """
+    try:
+        with open(file) as f:
+            record = json.load(f)
+    except (OSError, ValueError) as error:
+        return [{'pointer': '', 'message': str(error)}]
+
+    return [
+        {
+            'pointer': json_pointer(error.absolute_path),
+            'message': error.message,
+        }
+        for error in validator.iter_errors(record)
+    ]
+
+
+def validate_chunk(files):
+    """Validate ``files`` with the validator of the current process."""
+    return [(file, validate_file(file, _validator)) for file in files]
+
+
+def validate_files(files, schema, jobs=1,
+                   chunk_size=config.DEFAULT_VALIDATE_CHUNK_SIZE, cache=None):
+    """Validate ``files`` against ``schema``.
+
+    With ``jobs`` greater than one, chunks of ``chunk_size`` files are
+    validated in a pool of worker processes, each of which builds its
+    validator once. Files with a result in ``cache`` are not validated
+    again, and fresh results are stored in it.
+
+    :returns: An iterator of ``(file, errors)`` in the order of ``files``.
+    """
+    cached = {}
+    pending = []
+    for file in files:
+        key, errors = cache.lookup(file) if cache else (None, None)
+        if errors is None:
+            pending.append((file, key))
+        else:
+            cached[file] = errors
+
+    fresh = _validate_files(
+        [file for file, _ in pending], schema, jobs, chunk_size
+    )
+    keys = iter(key for _, key in pending)
+    for file in files:
+        if file in cached:
+            yield file, cached[file]
+            continue
+        _, errors = next(fresh)
+        if cache:
+            cache.store(file, next(keys), errors)
+        yield file, errors
+
+
+def _validate_files(files, schema, jobs, chunk_size):
+    chunks = [
+        files[i:i + chunk_size] for i in range(0, len(files), chunk_size)
+    ]
+
+    if jobs == 1:
+        init_validator(schema)
+        for chunk in chunks:
+            yield from validate_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs,
+                             initializer=init_validator,
+                             initargs=(schema,)) as executor:
+        for results in executor.map(validate_chunk, chunks):
+            yield from results
+
+
+class ValidationCache(object):
+    """Validation results of earlier runs, stored as JSON at ``path``.
+
+    Results are keyed by file path, size and modification time, and the
+    whole cache is dropped when the digest of the schema changes.
+    """
+
+    def __init__(self, path, schema):
+        """Load the cache at ``path`` for ``schema``."""
+        self.path = path
+        self.schema_digest = hashlib.sha256(
+            json.dumps(schema, sort_keys=True).encode()
+        ).hexdigest()
+        self._entries = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except ValueError:
+                data = {}
+            if data.get('schema') == self.schema_digest:
+                self._entries = data['files']
+
+    def lookup(self, file):
+        """Return ``(key, errors)`` for ``file``.
+
+        ``errors`` is ``None`` if there is no result for the current
+        ``key`` of the file. Pass ``key`` on to :meth:`store`.
+        """
+        try:
+            stat = os.stat(file)
+        except OSError:
+            return None, None
+        key = [stat.st_size, stat.st_mtime_ns]
+
+        entry = self._entries.get(file)
+        if entry is not None and entry['key'] == key:
+            return key, entry['errors']
+        return key, None
+
+    def store(self, file, key, errors):
+        """Store the ``errors`` of ``file`` as seen with ``key``."""
+        if key is not None:
+            self._entries[file] = {'key': key, 'errors': errors}
+
+    def save(self):
+        """Write the cache, evicting entries of deleted files."""
+        self._entries = {
+            file: entry for file, entry in self._entries.items()
+            if os.path.exists(file)
+        }
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'schema': self.schema_digest, 'files': self._entries},
+                      f)
+        os.replace(tmp_path, self.path)
+
+
+def summarize(results):
+    """Summarize ``(file, errors)`` pairs as a JSON serializable dict."""
+    total = 0
+    failures = []
+    for file, errors in results:
+        total += 1
+        if errors:
+            failures.append({'file': file, 'errors': errors})
+
+    return {
+        'total': total,
+        'passed': total - len(failures),
+        'failed': len(failures),
+        'failures': failures,
+    }